@@ -1,24 +1,195 @@
-from fastapi import FastAPI, APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, APIRouter, File, HTTPException, Query, Request, Response, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReplaceOne, UpdateOne, monitoring
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ValidationError
+from typing import List, Optional, Dict, Any, Set
 import uuid
 from datetime import datetime, timezone
 import json
+import hashlib
+import csv
+import io
+import base64
 import asyncio
+import bisect
+import heapq
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+import numpy as np
+import orjson
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Metrics
+# Histogram bucket upper bounds, in seconds
+METRICS_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+class Metric:
+    """A Prometheus metric family; series are keyed by their label values."""
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        # Mongo command events arrive on driver threads
+        self.lock = threading.Lock()
+        METRICS.append(self)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: tuple = ()):
+        super().__init__(name, description, labels)
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in list(self.values.items())]
+
+class Gauge(Metric):
+    """Values are read from ``collect`` at scrape time, so the hot path pays nothing."""
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labels: tuple = (), collect=None):
+        super().__init__(name, description, labels)
+        self.collect = collect
+
+    def samples(self) -> List[str]:
+        values = self.collect() if self.collect else {}
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in values.items()]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: tuple = (), buckets: tuple = METRICS_LATENCY_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = buckets
+        # labels -> per-bucket counts (last slot is +Inf), then sum and count
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *labels):
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in list(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                labels = _format_labels(self.labels + ("le",), key + (bound,))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, key)
+            lines.append(f"{self.name}_sum{labels} {series[-2]}")
+            lines.append(f"{self.name}_count{labels} {series[-1]}")
+        return lines
+
+METRICS: List[Metric] = []
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "API request latency by route template", ("method", "route", "status"))
+MONGO_COMMAND_SECONDS = Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command"))
+MONGO_COMMAND_FAILURES = Counter(
+    "mongo_command_failures_total", "MongoDB commands that returned an error", ("collection", "command"))
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "Recommendation LLM call latency by outcome", ("outcome",))
+RECOMMENDATION_SOURCE = Counter(
+    "recommendations_total", "Recommendation lists served by the LLM or the optimizer fallback", ("source",))
+WS_BROADCAST_SECONDS = Histogram(
+    "ws_broadcast_duration_seconds", "Time to fan one room message out to its sockets' send queues")
+WS_EVICTIONS = Counter(
+    "ws_evictions_total", "Sockets dropped for a full send queue or a failed send", ("reason",))
+
+class MongoCommandTimer(monitoring.CommandListener):
+    """Times every command the driver runs, per collection and command name."""
+
+    def __init__(self):
+        self.pending: Dict[tuple, tuple] = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        key = (event.connection_id, event.request_id)
+        self.pending[key] = (collection if isinstance(collection, str) else "", event.command_name)
+
+    def succeeded(self, event):
+        labels = self.pending.pop((event.connection_id, event.request_id), None)
+        if labels:
+            MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, *labels)
+
+    def failed(self, event):
+        labels = self.pending.pop((event.connection_id, event.request_id), None)
+        if labels:
+            MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, *labels)
+            MONGO_COMMAND_FAILURES.inc(*labels)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording per-route latency; labels use the route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start, scope["method"], getattr(route, "path", "unmatched"), status[0])
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, event_listeners=[MongoCommandTimer()])
 db = client[os.environ['DB_NAME']]
 
 # Create the main app without a prefix
@@ -28,35 +199,170 @@ app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
 # WebSocket connection manager
+WS_SEND_QUEUE_SIZE = int(os.environ.get('WS_SEND_QUEUE_SIZE', '256'))
+WS_SEND_TIMEOUT = float(os.environ.get('WS_SEND_TIMEOUT', '5'))
+# What to do when a socket's outbox is full: 'disconnect' the client or 'drop_oldest' message
+WS_SLOW_CONSUMER_POLICY = os.environ.get('WS_SLOW_CONSUMER_POLICY', 'disconnect')
+
+class RoomConnection:
+    """A connected socket with its own bounded outbox drained by a writer task."""
+
+    def __init__(self, websocket: WebSocket, room_code: str, user_id: str):
+        self.websocket = websocket
+        self.room_code = room_code
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.writer: Optional[asyncio.Task] = None
+
+ROOM_EVENT_BUFFER = int(os.environ.get('ROOM_EVENT_BUFFER', '256'))
+ROOM_EVENT_LOG_ROOMS = int(os.environ.get('ROOM_EVENT_LOG_ROOMS', '1000'))
+# Longest replay queued on reconnect; half the outbox leaves room for live events
+ROOM_REPLAY_LIMIT = WS_SEND_QUEUE_SIZE // 2
+
+class RoomEventLog:
+    """Sequence counter and ring buffer of recent events for one room.
+
+    The counter is per-process, which is one reason the backend supports a
+    single worker only.
+    """
+
+    def __init__(self, maxlen: int = ROOM_EVENT_BUFFER):
+        self.last_seq = 0
+        self.events: deque = deque(maxlen=maxlen)  # (seq, message)
+
+    @property
+    def delivered_seq(self) -> int:
+        return self.events[-1][0] if self.events else 0
+
+    def since(self, seq: int) -> Optional[List[str]]:
+        """Messages after ``seq``, or None when the buffer no longer covers the gap."""
+        if seq == self.delivered_seq:
+            return []
+        if not self.events or seq > self.events[-1][0] or seq < self.events[0][0] - 1:
+            return None
+        return [message for event_seq, message in self.events if event_seq > seq]
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        # room code -> {websocket: connection}; membership changes are O(1)
+        self.active_connections: Dict[str, Dict[WebSocket, RoomConnection]] = {}
+        # room code -> event log, least recently used first
+        self.event_logs: OrderedDict = OrderedDict()
+
+    def event_log(self, room_code: str) -> RoomEventLog:
+        log = self.event_logs.get(room_code)
+        if log is None:
+            log = self.event_logs[room_code] = RoomEventLog()
+            if len(self.event_logs) > ROOM_EVENT_LOG_ROOMS:
+                self.event_logs.popitem(last=False)
+        else:
+            self.event_logs.move_to_end(room_code)
+        return log
         
     async def connect(self, websocket: WebSocket, room_code: str, user_id: str):
         await websocket.accept()
         websocket.user_id = user_id
-        if room_code not in self.active_connections:
-            self.active_connections[room_code] = []
-        self.active_connections[room_code].append(websocket)
+        websocket.room_code = room_code
+        connection = RoomConnection(websocket, room_code, user_id)
+        connection.writer = asyncio.create_task(self._write_loop(connection))
+        self.active_connections.setdefault(room_code, {})[websocket] = connection
         
     def disconnect(self, websocket: WebSocket, room_code: str):
-        if room_code in self.active_connections:
-            if websocket in self.active_connections[room_code]:
-                self.active_connections[room_code].remove(websocket)
+        room = self.active_connections.get(room_code)
+        if room is None:
+            return
+        connection = room.pop(websocket, None)
+        if not room:
+            del self.active_connections[room_code]
+        if connection and connection.writer and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
                 
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+        room = self.active_connections.get(getattr(websocket, "room_code", None), {})
+        connection = room.get(websocket)
+        if connection:
+            self._enqueue(connection, message)
+        else:
+            await websocket.send_text(message)
         
-    async def broadcast_to_room(self, message: str, room_code: str):
-        if room_code in self.active_connections:
-            for connection in self.active_connections[room_code]:
-                try:
-                    await connection.send_text(message)
-                except Exception as e:
-                    print(f"Error sending message: {e}")
+    async def broadcast_to_room(self, message: str, room_code: str, seq: Optional[int] = None):
+        self.deliver_to_room(message, room_code, seq)
+
+    async def broadcast_event(self, room_code: str, event: Dict[str, Any]):
+        """Stamp a room event with the room's next sequence number and broadcast it."""
+        log = self.event_log(room_code)
+        log.last_seq += 1
+        event["seq"] = log.last_seq
+        await self.broadcast_to_room(json.dumps(event), room_code, log.last_seq)
+
+    def replay(self, websocket: WebSocket, room_code: str, since: int) -> bool:
+        """Queue the events a reconnecting client missed; False if they are no longer buffered."""
+        missed = self.event_log(room_code).since(since)
+        if missed is None or len(missed) > ROOM_REPLAY_LIMIT:
+            return False
+        connection = self.active_connections.get(room_code, {}).get(websocket)
+        for message in missed:
+            self._enqueue(connection, message)
+        return True
+
+    def deliver_to_room(self, message: str, room_code: str, seq: Optional[int] = None):
+        if seq is not None:
+            log = self.event_log(room_code)
+            log.events.append((seq, message))
+            log.last_seq = max(log.last_seq, seq)
+        # Enqueue only: a slow socket never delays delivery to the rest of the room
+        start = time.perf_counter()
+        for connection in list(self.active_connections.get(room_code, {}).values()):
+            self._enqueue(connection, message)
+        WS_BROADCAST_SECONDS.observe(time.perf_counter() - start)
+
+    def _enqueue(self, connection: RoomConnection, message: str):
+        try:
+            connection.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            if WS_SLOW_CONSUMER_POLICY == 'drop_oldest':
+                connection.queue.get_nowait()
+                connection.queue.put_nowait(message)
+            else:
+                logger.warning("Evicting slow consumer %s from room %s", connection.user_id, connection.room_code)
+                WS_EVICTIONS.inc("queue_full")
+                self._evict(connection)
+
+    async def _write_loop(self, connection: RoomConnection):
+        while True:
+            message = await connection.queue.get()
+            try:
+                await asyncio.wait_for(connection.websocket.send_text(message), WS_SEND_TIMEOUT)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Dropping socket %s in room %s: %s", connection.user_id, connection.room_code, e)
+                WS_EVICTIONS.inc("send_failed")
+                self._evict(connection)
+                return
+
+    def _evict(self, connection: RoomConnection):
+        self.disconnect(connection.websocket, connection.room_code)
+        asyncio.create_task(self._close(connection.websocket))
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=1008)
+        except Exception:
+            pass
 
 manager = ConnectionManager()
 
+WS_CONNECTIONS = Gauge(
+    "ws_connections", "Open sockets per room", ("room",),
+    collect=lambda: {(room,): len(connections) for room, connections in list(manager.active_connections.items())})
+WS_SEND_QUEUE_DEPTH = Gauge(
+    "ws_send_queue_depth", "Messages waiting in a room's socket send queues", ("room",),
+    collect=lambda: {
+        (room,): sum(connection.queue.qsize() for connection in list(connections.values()))
+        for room, connections in list(manager.active_connections.items())
+    })
+
 # Models
 class User(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -111,6 +417,9 @@ class PlayerCreate(BaseModel):
     player_type: str
     stats: PlayerStats
 
+class PlayerBatchRequest(BaseModel):
+    ids: List[str]
+
 class BuyerProfile(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
@@ -138,11 +447,14 @@ class AuctionRoom(BaseModel):
     auction_status: str = "waiting"  # waiting, active, completed
     auction_start_time: Optional[datetime] = None
     bid_timer: int = 5  # seconds
+    bid_coalesce_ms: Optional[int] = None  # None: server default (BID_BROADCAST_COALESCE_MS)
     results: Dict[str, Any] = {}
+    bids_archived: bool = False  # bid history compacted into bid_archive
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class AuctionRoomCreate(BaseModel):
     room_name: str
+    bid_coalesce_ms: Optional[int] = Field(None, ge=0, le=1000)
 
 class Bid(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -155,7 +467,72 @@ class Bid(BaseModel):
 class BidCreate(BaseModel):
     room_id: str
     player_id: str
-    amount: float
+    amount: float  # NaN/inf are rejected by AuctionEngine.place_bid with a 400
+
+class SimulationRequest(BaseModel):
+    runs: int = Field(2000, ge=1, le=20000)
+    lot_order: Optional[List[str]] = None  # player IDs; defaults to the room's lot order
+    budgets: Dict[str, float] = {}  # user ID -> remaining budget, overriding the buyer's profile
+    noise: float = Field(0.25, ge=0, le=2)  # spread of each bidder's valuation (lognormal sigma)
+    bid_increment: Optional[float] = Field(None, gt=0)  # defaults to 1% of an even squad share of the mean budget
+    seed: Optional[int] = None
+
+# Query projections: fetch only what a model or check needs, never Mongo's _id
+def model_projection(model) -> Dict[str, int]:
+    return {"_id": 0, **{field: 1 for field in model.model_fields}}
+
+USER_PROJECTION = model_projection(User)
+PLAYER_PROJECTION = model_projection(Player)
+BUYER_PROFILE_PROJECTION = model_projection(BuyerProfile)
+AUCTION_ROOM_PROJECTION = model_projection(AuctionRoom)
+EXISTS_PROJECTION = {"_id": 1}
+
+# Indexes backing every query in this module; created on startup
+MONGO_INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("id", ASCENDING)], unique=True),
+    ],
+    "players": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("performance_score", DESCENDING), ("id", ASCENDING)]),
+        IndexModel([("player_type", ASCENDING), ("performance_score", DESCENDING), ("id", ASCENDING)]),
+    ],
+    "buyer_profiles": [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+        IndexModel([("id", ASCENDING)], unique=True),
+    ],
+    "auction_rooms": [
+        IndexModel([("room_code", ASCENDING)], unique=True),
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("auction_status", ASCENDING)]),
+    ],
+    "bid_buckets": [
+        IndexModel([("room_id", ASCENDING), ("lot_index", ASCENDING), ("first_amount", ASCENDING)]),
+    ],
+    "bid_archive": [
+        IndexModel([("room_id", ASCENDING), ("lot_index", ASCENDING)], unique=True),
+    ],
+}
+
+# Created by earlier versions; the unique id indexes already serve their queries
+OBSOLETE_MONGO_INDEXES = {
+    "users": ["id_1_user_type_1"],
+    "auction_rooms": ["id_1_auction_status_1"],
+}
+
+async def ensure_indexes():
+    for collection, indexes in MONGO_INDEXES.items():
+        try:
+            await db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            # Typically duplicate data blocking a unique index; keep serving
+            logger.error("Could not create indexes on %s: %s", collection, e)
+    for collection, names in OBSOLETE_MONGO_INDEXES.items():
+        existing = await db[collection].index_information()
+        for name in names:
+            if name in existing:
+                await db[collection].drop_index(name)
 
 # Performance scoring function
 def calculate_performance_score(stats: PlayerStats, player_type: str) -> float:
@@ -191,8 +568,878 @@ def calculate_performance_score(stats: PlayerStats, player_type: str) -> float:
     
     return min(score * 10, 10.0)  # Scale to 1-10
 
+def calculate_performance_scores(stats: List[PlayerStats], player_types: List[str]) -> np.ndarray:
+    """Vectorized calculate_performance_score for a batch of players.
+
+    Mirrors the scalar function term by term and in the same operation
+    order, so each result is bit-for-bit equal to the scalar score.
+    """
+    def column(field: str) -> np.ndarray:
+        return np.fromiter((getattr(s, field) for s in stats), dtype=np.float64, count=len(stats))
+
+    types = np.asarray(player_types, dtype=object)
+    bats = np.isin(types, ['batsman', 'all-rounder', 'wicket-keeper'])
+    bowls = np.isin(types, ['bowler', 'all-rounder'])
+
+    strike_rate = column('strike_rate')
+    batting_average = column('batting_average')
+    batting_score = np.where(strike_rate > 0, np.minimum(strike_rate / 150 * 4, 4), 0.0)
+    batting_score = batting_score + np.where(batting_average > 0, np.minimum(batting_average / 50 * 2, 2), 0.0)
+    batting_score = batting_score + (column('centuries') * 0.5 + column('fifties') * 0.3)
+
+    economy_rate = column('economy_rate')
+    wickets_taken = column('wickets_taken')
+    bowling_score = np.where(economy_rate > 0, np.maximum(0, (8 - economy_rate) / 8 * 4), 0.0)
+    bowling_score = bowling_score + np.where(wickets_taken > 0, np.minimum(wickets_taken / 100 * 2, 2), 0.0)
+
+    fielding_score = column('catches') * 0.1 + column('run_outs') * 0.2
+    overall_score = (column('recent_form_rating') / 10 * 0.5 +
+                     np.minimum(column('experience_years') / 15, 1) * 0.5)
+
+    score = np.zeros(len(stats)) + np.where(bats, np.minimum(batting_score, 4) * 0.4, 0.0)
+    score = score + np.where(bowls, np.minimum(bowling_score, 3.5) * 0.35, 0.0)
+    score = score + np.minimum(fielding_score, 1.5) * 0.15
+    score = score + overall_score * 0.1
+    return np.minimum(score * 10, 10.0)
+
+# In-process caches
+class TTLCache:
+    """Size-bounded LRU cache whose entries also expire after ``ttl`` seconds.
+
+    ``on_evict(key, value)`` is called for entries dropped by size or age.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, on_evict=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self._data: OrderedDict = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            if self.on_evict:
+                self.on_evict(key, value)
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            evicted, (_, value) = self._data.popitem(last=False)
+            if self.on_evict:
+                self.on_evict(evicted, value)
+
+    def pop(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+DOCUMENT_CACHE_SIZE = int(os.environ.get('DOCUMENT_CACHE_SIZE', '10000'))
+DOCUMENT_CACHE_TTL = float(os.environ.get('DOCUMENT_CACHE_TTL', '60'))
+
+class DocumentCache:
+    """Read-through cache of one collection's documents, addressable by any of its unique ``fields``.
+
+    Each document is one entry keyed by its first field; the other fields
+    resolve to that key through ``aliases``, so invalidating by any field
+    drops the document for all of them. Every write in this module calls
+    ``invalidate`` after it lands; the TTL only bounds how stale a change
+    made outside this process can look. A read that raced a write is
+    returned but not cached.
+    """
+
+    def __init__(self, collection: str, projection: Dict[str, int], fields: tuple,
+                 maxsize: int = DOCUMENT_CACHE_SIZE, ttl: float = DOCUMENT_CACHE_TTL):
+        self.collection = collection
+        self.projection = projection
+        self.fields = fields
+        self.entries = TTLCache(maxsize, ttl, on_evict=self._forget_aliases)  # first field's value -> document
+        self.aliases: Dict[tuple, Any] = {}  # (other field, value) -> first field's value
+        self._generation = 0
+
+    def _key(self, field: str, value):
+        return value if field == self.fields[0] else self.aliases.get((field, value))
+
+    def _forget_aliases(self, key, document: Dict[str, Any]):
+        for field in self.fields[1:]:
+            alias = (field, document.get(field))
+            if self.aliases.get(alias) == key:
+                del self.aliases[alias]
+
+    async def get(self, field: str, value) -> Optional[Dict[str, Any]]:
+        """The document with ``field == value``; callers must not mutate it."""
+        key = self._key(field, value)
+        document = self.entries.get(key) if key is not None else None
+        # An alias can outlive a change to its field
+        if document is not None and document.get(field) == value:
+            return document
+        generation = self._generation
+        document = await db[self.collection].find_one({field: value}, self.projection)
+        if document is not None and generation == self._generation and self.fields[0] in document:
+            key = document[self.fields[0]]
+            previous = self.entries.get(key)
+            if previous is not None:
+                self._forget_aliases(key, previous)
+            self.entries.set(key, document)
+            for alias_field in self.fields[1:]:
+                if alias_field in document:
+                    self.aliases[(alias_field, document[alias_field])] = key
+        return document
+
+    def invalidate(self, field: str, value):
+        self._generation += 1
+        key = self._key(field, value)
+        if key is None:
+            return
+        document = self.entries.get(key)
+        self.entries.pop(key)
+        if document is not None:
+            self._forget_aliases(key, document)
+
+user_cache = DocumentCache("users", USER_PROJECTION, ("id", "email"))
+buyer_profile_cache = DocumentCache("buyer_profiles", BUYER_PROFILE_PROJECTION, ("user_id",))
+room_cache = DocumentCache("auction_rooms", AUCTION_ROOM_PROJECTION, ("room_code", "id"))
+
+async def is_host(user_id: str) -> bool:
+    user = await user_cache.get("id", user_id)
+    return user is not None and user.get("user_type") == "host"
+
+RECOMMENDATION_CACHE_SIZE = int(os.environ.get('RECOMMENDATION_CACHE_SIZE', '1024'))
+RECOMMENDATION_CACHE_TTL = float(os.environ.get('RECOMMENDATION_CACHE_TTL', '300'))
+
+class RecommendationCache:
+    """Recommendation lists keyed on what they depend on, with request coalescing.
+
+    Every key carries the player-catalog version, so ``invalidate()`` (called
+    when players are added or rescored, or a lot is sold) retires all
+    entries at once. Identical requests that arrive while one is being
+    computed share its result instead of issuing another LLM call.
+    """
+
+    def __init__(self, maxsize: int = RECOMMENDATION_CACHE_SIZE, ttl: float = RECOMMENDATION_CACHE_TTL):
+        self.entries = TTLCache(maxsize, ttl)
+        self.catalog_version = 0
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+    def key(self, profile: "BuyerProfile") -> tuple:
+        return (
+            self.catalog_version,
+            profile.budget,
+            profile.remaining_budget,
+            tuple(sorted(profile.preferred_players)),
+            tuple(profile.current_team),
+        )
+
+    def invalidate(self):
+        self.catalog_version += 1
+        self.entries.clear()
+
+    async def get_or_compute(self, key: tuple, compute):
+        cached = self.entries.get(key)
+        if cached is not None:
+            return cached
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        # A disconnecting caller must not cancel the computation others wait on
+        return await asyncio.shield(task)
+
+    def _finish(self, key: tuple, task: asyncio.Future):
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        if key[0] == self.catalog_version:
+            self.entries.set(key, task.result())
+
+recommendation_cache = RecommendationCache()
+
+# Write-behind bid log
+BID_LOG_FLUSH_INTERVAL = float(os.environ.get('BID_LOG_FLUSH_MS', '10')) / 1000
+BID_LOG_BATCH_SIZE = int(os.environ.get('BID_LOG_BATCH_SIZE', '200'))
+BID_LOG_QUEUE_SIZE = int(os.environ.get('BID_LOG_QUEUE_SIZE', '10000'))
+BID_LOG_WRITE_ATTEMPTS = 3
+BID_LOG_RETRY_DELAY = 1.0  # seconds before a batch that exhausted its attempts is tried again
+# Bids kept per bid_buckets document before a lot starts a new bucket
+BID_BUCKET_SIZE = int(os.environ.get('BID_BUCKET_SIZE', '200'))
+
+def bid_bucket_updates(batch: List[tuple]) -> List[UpdateOne]:
+    """One upsert per (room, lot) appending its bids to the lot's open bucket."""
+    lots: Dict[tuple, List[Bid]] = {}
+    for _, bid, lot_index in batch:
+        lots.setdefault((bid.room_id, lot_index), []).append(bid)
+    updates = []
+    for (room_id, lot_index), bids in lots.items():
+        bids.sort(key=lambda bid: bid.amount)
+        updates.append(UpdateOne(
+            {"room_id": room_id, "lot_index": lot_index, "count": {"$lt": BID_BUCKET_SIZE}},
+            {
+                "$setOnInsert": {"player_id": bids[0].player_id},
+                "$push": {"bids": {"$each": [
+                    {"id": bid.id, "bidder_id": bid.bidder_id, "amount": bid.amount, "timestamp": bid.timestamp}
+                    for bid in bids
+                ]}},
+                "$inc": {"count": len(bids)},
+                "$min": {"first_amount": bids[0].amount},
+                "$max": {"last_amount": bids[-1].amount}
+            },
+            upsert=True
+        ))
+    return updates
+
+async def unwritten_bids(batch: List[tuple]) -> List[tuple]:
+    """The entries of ``batch`` whose bid id is not in any bid bucket yet."""
+    room_ids = list({bid.room_id for _, bid, _ in batch})
+    bid_ids = [bid.id for _, bid, _ in batch]
+    written = set()
+    buckets = db.bid_buckets.find(
+        {"room_id": {"$in": room_ids}, "bids.id": {"$in": bid_ids}}, {"_id": 0, "bids.id": 1}
+    )
+    async for bucket in buckets:
+        written.update(entry.get("id") for entry in bucket["bids"])
+    return [entry for entry in batch if entry[1].id not in written]
+
+class BidLogWriter:
+    """Group-commits accepted bids to Mongo off the bidder's critical path.
+
+    Accepted bids go into a bounded queue (a full queue makes bidders wait
+    rather than dropping a bid) and one flusher task appends them to their
+    lots' bid_buckets every BID_LOG_FLUSH_INTERVAL or BID_LOG_BATCH_SIZE
+    bids, whichever comes first, along with each room's latest highest bid.
+    ``flush()`` forces everything queued so far to be written; bids
+    queued after it was called do not hold it up.
+
+    A batch that still fails after BID_LOG_WRITE_ATTEMPTS is kept and
+    retried ahead of newer bids, so ``flush()`` waits for it. Retries skip
+    bids whose id already landed.
+    """
+
+    def __init__(self, interval: float = BID_LOG_FLUSH_INTERVAL, batch_size: int = BID_LOG_BATCH_SIZE,
+                 maxsize: int = BID_LOG_QUEUE_SIZE):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.maxsize = maxsize
+        self.queue: Optional[asyncio.Queue] = None
+        self._urgent: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._retry: List[tuple] = []  # batch awaiting another round of attempts
+        # Bids are written in queue order, so counting both ends tells a
+        # flush when every bid queued before it has landed
+        self._appended = 0
+        self._written = 0
+        self._flushes: deque = deque()  # (bids appended when called, future), oldest first
+        self.stats = {
+            "flushes": 0,
+            "bids_written": 0,
+            "write_errors": 0,
+            "batches_requeued": 0,
+            "last_flush_size": 0,
+            "max_flush_size": 0,
+            "last_flush_lag_ms": 0.0,
+            "max_flush_lag_ms": 0.0,
+        }
+
+    def _ensure_running(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue(maxsize=self.maxsize)
+            self._urgent = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    @property
+    def pending(self) -> int:
+        return self.queue.qsize() if self.queue else 0
+
+    async def append(self, bid: Bid, lot_index: int):
+        self._ensure_running()
+        await self.queue.put((time.monotonic(), bid, lot_index))
+        self._appended += 1
+        if self.queue.qsize() >= self.batch_size:
+            self._urgent.set()
+
+    async def flush(self):
+        if self._written >= self._appended:
+            return
+        self._ensure_running()
+        done = asyncio.get_running_loop().create_future()
+        self._flushes.append((self._appended, done))
+        self._urgent.set()
+        await done
+
+    async def stop(self):
+        await self.flush()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            batch, self._retry = self._retry, []
+            recovering = bool(batch)
+            if not batch:
+                batch = [await self.queue.get()]
+                # Give concurrent bids a short window to join this group commit
+                if not self._urgent.is_set():
+                    try:
+                        await asyncio.wait_for(self._urgent.wait(), self.interval)
+                    except asyncio.TimeoutError:
+                        pass
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            if self.queue.qsize() < self.batch_size and not self._flushes:
+                self._urgent.clear()
+            if not await self._write(batch, recovering):
+                self._retry = batch
+                self.stats["batches_requeued"] += 1
+                await asyncio.sleep(BID_LOG_RETRY_DELAY)
+                continue
+            self._written += len(batch)
+            while self._flushes and self._flushes[0][0] <= self._written:
+                _, done = self._flushes.popleft()
+                if not done.done():
+                    done.set_result(None)
+
+    async def _write(self, batch: List[tuple], recovering: bool = False) -> bool:
+        highest: Dict[str, tuple] = {}
+        for _, bid, lot_index in batch:
+            if bid.room_id not in highest or bid.amount > highest[bid.room_id][1].amount:
+                highest[bid.room_id] = (lot_index, bid)
+
+        pending = batch
+        for attempt in range(1, BID_LOG_WRITE_ATTEMPTS + 1):
+            try:
+                # A failed attempt may still have appended some lots' bids
+                if recovering or attempt > 1:
+                    pending = await unwritten_bids(pending)
+                if pending:
+                    await db.bid_buckets.bulk_write(bid_bucket_updates(pending), ordered=False)
+                for room_id, (lot_index, bid) in highest.items():
+                    # The filter keeps a late flush from regressing the room
+                    await db.auction_rooms.update_one(
+                        {"id": room_id, "current_player_index": lot_index, "current_highest_bid": {"$lt": bid.amount}},
+                        {"$set": {
+                            "current_highest_bid": bid.amount,
+                            "current_highest_bidder": bid.bidder_id
+                        }}
+                    )
+                    room_cache.invalidate("id", room_id)
+                break
+            except Exception:
+                self.stats["write_errors"] += 1
+                logger.exception("Bid log flush failed (attempt %d of %d)", attempt, BID_LOG_WRITE_ATTEMPTS)
+                if attempt == BID_LOG_WRITE_ATTEMPTS:
+                    return False
+                await asyncio.sleep(0.1 * attempt)
+
+        lag_ms = (time.monotonic() - batch[0][0]) * 1000
+        self.stats["flushes"] += 1
+        self.stats["bids_written"] += len(batch)
+        self.stats["last_flush_size"] = len(batch)
+        self.stats["max_flush_size"] = max(self.stats["max_flush_size"], len(batch))
+        self.stats["last_flush_lag_ms"] = lag_ms
+        self.stats["max_flush_lag_ms"] = max(self.stats["max_flush_lag_ms"], lag_ms)
+        return True
+
+bid_log = BidLogWriter()
+
+BID_ARCHIVE_INTERVAL = float(os.environ.get('BID_ARCHIVE_INTERVAL', '3600'))  # seconds; 0 disables
+
+class BidArchiver:
+    """Compacts the bid history of completed rooms.
+
+    Each lot's buckets become one bid_archive document holding parallel
+    amount and timestamp arrays plus bidder indexes into a per-lot bidder
+    list, and the buckets are deleted. Runs every BID_ARCHIVE_INTERVAL.
+    """
+
+    def __init__(self, interval: float = BID_ARCHIVE_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.archive_completed_rooms()
+            except Exception:
+                logger.exception("Bid archival failed")
+            await asyncio.sleep(self.interval)
+
+    async def archive_completed_rooms(self) -> int:
+        archived = 0
+        rooms = db.auction_rooms.find(
+            {"auction_status": "completed", "bids_archived": {"$ne": True}}, {"_id": 0, "id": 1}
+        )
+        async for room in rooms:
+            await self.archive_room(room["id"])
+            await db.auction_rooms.update_one({"id": room["id"]}, {"$set": {"bids_archived": True}})
+            room_cache.invalidate("id", room["id"])
+            archived += 1
+        return archived
+
+    async def archive_room(self, room_id: str):
+        lots: Dict[int, Dict[str, Any]] = {}
+        async for bucket in db.bid_buckets.find({"room_id": room_id}, {"_id": 0, "lot_index": 1, "player_id": 1, "bids": 1}):
+            lot = lots.setdefault(bucket["lot_index"], {"player_id": bucket.get("player_id"), "bids": []})
+            lot["bids"].extend(bucket["bids"])
+
+        archives = []
+        for lot_index, lot in lots.items():
+            bids = sorted(lot["bids"], key=lambda bid: bid["amount"])
+            bidders = list(dict.fromkeys(bid["bidder_id"] for bid in bids))
+            position = {bidder_id: i for i, bidder_id in enumerate(bidders)}
+            archives.append(ReplaceOne({"room_id": room_id, "lot_index": lot_index}, {
+                "room_id": room_id,
+                "lot_index": lot_index,
+                "player_id": lot["player_id"],
+                "count": len(bids),
+                "bidders": bidders,
+                "bidder": [position[bid["bidder_id"]] for bid in bids],
+                "amount": [bid["amount"] for bid in bids],
+                "timestamp": [bid["timestamp"] for bid in bids]
+            }, upsert=True))
+        # Replacing by (room, lot) keeps a rerun after a partial failure idempotent
+        if archives:
+            await db.bid_archive.bulk_write(archives, ordered=False)
+        await db.bid_buckets.delete_many({"room_id": room_id})
+
+bid_archiver = BidArchiver()
+
+# In-memory auction engine
+class BidRejected(Exception):
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+class RoomAuctionState:
+    """Authoritative live state of one auction room.
+
+    Every bid is accepted or rejected against this object while holding
+    ``lock``; Mongo only receives a durable copy of the outcome.
+    """
+
+    def __init__(self, room: Dict[str, Any]):
+        self.room_id: str = room["id"]
+        self.room_code: str = room["room_code"]
+        self.players: List[str] = list(room.get("players", []))
+        self.current_player_index: int = room.get("current_player_index", 0)
+        self.current_highest_bid: float = room.get("current_highest_bid", 0.0)
+        self.current_highest_bidder: Optional[str] = room.get("current_highest_bidder")
+        self.auction_status: str = room.get("auction_status", "waiting")
+        self.bid_timer: int = room.get("bid_timer", 5)
+        coalesce_ms = room.get("bid_coalesce_ms")
+        self.bid_coalesce_ms: int = BID_BROADCAST_COALESCE_MS if coalesce_ms is None else coalesce_ms
+        self.lock = asyncio.Lock()
+
+    @property
+    def current_player(self) -> Optional[str]:
+        if self.current_player_index < len(self.players):
+            return self.players[self.current_player_index]
+        return None
+
+class AuctionEngine:
+    def __init__(self):
+        self.rooms: Dict[str, RoomAuctionState] = {}  # room id -> state
+        self.room_ids: Dict[str, str] = {}  # room code -> room id
+        self.budgets: Dict[str, float] = {}  # buyer user id -> remaining budget
+        self._load_lock = asyncio.Lock()
+
+    def _cached(self, room_id: Optional[str], room_code: Optional[str]) -> Optional[RoomAuctionState]:
+        if room_id is None and room_code is not None:
+            room_id = self.room_ids.get(room_code)
+        return self.rooms.get(room_id) if room_id else None
+
+    async def get_room(self, room_id: Optional[str] = None, room_code: Optional[str] = None) -> Optional[RoomAuctionState]:
+        state = self._cached(room_id, room_code)
+        if state:
+            return state
+        async with self._load_lock:
+            state = self._cached(room_id, room_code)
+            if state:
+                return state
+            room = await (room_cache.get("id", room_id) if room_id else room_cache.get("room_code", room_code))
+            if not room:
+                return None
+            state = RoomAuctionState(room)
+            self.rooms[state.room_id] = state
+            self.room_ids[state.room_code] = state.room_id
+            return state
+
+    def forget(self, room_code: str):
+        room_id = self.room_ids.pop(room_code, None)
+        if room_id:
+            self.rooms.pop(room_id, None)
+
+    def add_player(self, room_code: str, player_id: str):
+        state = self._cached(None, room_code)
+        if state and player_id not in state.players:
+            state.players.append(player_id)
+
+    def forget_budget(self, user_id: str):
+        self.budgets.pop(user_id, None)
+
+    async def _load_budget(self, bidder_id: str):
+        if bidder_id in self.budgets:
+            return
+        profile = await buyer_profile_cache.get("user_id", bidder_id)
+        if profile:
+            # Another coroutine may have cached (and already debited) it meanwhile
+            self.budgets.setdefault(bidder_id, profile.get("remaining_budget", 0))
+
+    async def place_bid(self, room_id: str, bidder_id: str, player_id: str, amount: float):
+        if not math.isfinite(amount):
+            raise BidRejected("Bid amount must be a finite number")
+        state = await self.get_room(room_id=room_id)
+        if not state or state.auction_status != "active":
+            raise BidRejected("Auction not active")
+        await self._load_budget(bidder_id)
+
+        async with state.lock:
+            if state.auction_status != "active":
+                raise BidRejected("Auction not active")
+            if player_id != state.current_player:
+                raise BidRejected("Bid is not for the current player")
+            if amount <= state.current_highest_bid:
+                raise BidRejected("Bid must be higher than current highest bid")
+            if self.budgets.get(bidder_id, 0) < amount:
+                raise BidRejected("Insufficient budget")
+
+            state.current_highest_bid = amount
+            state.current_highest_bidder = bidder_id
+            lot_index = state.current_player_index
+            lot_timer.extend(state.room_code, state.bid_timer)
+            bid = Bid(room_id=room_id, player_id=player_id, bidder_id=bidder_id, amount=amount)
+            # Announced under the lock so it cannot trail its lot's closing event
+            await announce_bid(state, bid)
+
+        await bid_log.append(bid, lot_index)
+        return state, bid
+
+    async def close_lot(self, room_code: str) -> Optional[Dict[str, Any]]:
+        """Award the current lot, advance the room and broadcast it, returning the broadcast event."""
+        state = await self.get_room(room_code=room_code)
+        if not state or state.auction_status != "active":
+            return None
+
+        async with state.lock:
+            if state.current_player is None:
+                return None
+            current_player = state.current_player
+            lot_index = state.current_player_index
+            highest_bidder = state.current_highest_bidder
+            highest_bid = state.current_highest_bid
+            if highest_bidder and highest_bid > 0 and highest_bidder in self.budgets:
+                self.budgets[highest_bidder] -= highest_bid
+
+            next_index = state.current_player_index + 1
+            if next_index >= len(state.players):
+                state.auction_status = "completed"
+                room_update = {"auction_status": "completed"}
+                event = {"type": "auction_completed"}
+            else:
+                state.current_player_index = next_index
+                state.current_highest_bid = 0.0
+                state.current_highest_bidder = None
+                room_update = {
+                    "current_player_index": next_index,
+                    "current_highest_bid": 0.0,
+                    "current_highest_bidder": None
+                }
+                event = {
+                    "type": "next_player",
+                    "player_index": next_index,
+                    "player_id": state.players[next_index],
+                    "bid_timer": state.bid_timer
+                }
+            # Published before the lock is released: the lot's last bid goes out
+            # first, and no bid on the next lot can be accepted ahead of this event
+            await bid_coalescer.flush(room_code)
+            await manager.broadcast_event(room_code, event)
+            # The next lot's window starts with its announcement, so its bids
+            # extend a live deadline while the durable writes below run
+            if event["type"] == "next_player":
+                lot_timer.schedule(room_code, state.bid_timer)
+
+        # Every bid on this lot is durable before the award is recorded
+        await bid_log.flush()
+        sold = bool(highest_bidder and highest_bid > 0)
+        results_update = await self._lot_results_update(current_player, lot_index, highest_bidder if sold else None, highest_bid)
+        if sold:
+            recommendation_cache.invalidate()
+            player_rank_index.mark_sold(current_player)
+            await db.buyer_profiles.update_one(
+                {"user_id": highest_bidder},
+                {
+                    "$push": {"current_team": current_player},
+                    "$inc": {"remaining_budget": -highest_bid}
+                }
+            )
+            buyer_profile_cache.invalidate("user_id", highest_bidder)
+        results_update["$set"].update(room_update)
+        await db.auction_rooms.update_one({"room_code": room_code}, results_update)
+        room_cache.invalidate("room_code", room_code)
+        if event["type"] == "auction_completed":
+            # A finished room takes no more bids; reloads see it as completed
+            self.forget(room_code)
+        return event
+
+    async def _lot_results_update(self, player_id: str, lot_index: int,
+                                  buyer_id: Optional[str], price: float) -> Dict[str, Any]:
+        """Fold one closed lot into the room's materialized ``results``, as a Mongo update."""
+        update: Dict[str, Any] = {"$set": {}, "$inc": {"results.lots_closed": 1}}
+        if buyer_id is None:
+            update["$push"] = {"results.unsold": player_id}
+            return update
+        if player_rank_index.loaded and player_id in player_rank_index.players:
+            player_type, score = player_rank_index.players[player_id]
+        else:
+            player = await db.players.find_one({"id": player_id}, {"_id": 0, "player_type": 1, "performance_score": 1}) or {}
+            player_type, score = player.get("player_type"), player.get("performance_score", 0.0)
+        update["$set"][f"results.sold.{player_id}"] = {
+            "buyer_id": buyer_id,
+            "price": price,
+            "player_type": player_type,
+            "performance_score": score,
+            "lot_index": lot_index
+        }
+        update["$inc"].update({
+            "results.total_spent": price,
+            f"results.buyers.{buyer_id}.spent": price,
+            f"results.buyers.{buyer_id}.players": 1,
+            f"results.buyers.{buyer_id}.score_total": score
+        })
+        return update
+
+auction_engine = AuctionEngine()
+
+# Lot timer scheduler
+class LotTimerScheduler:
+    """Owns one lot deadline per active room.
+
+    A single background task sleeps until the earliest deadline, so the
+    cost does not grow with the number of connected clients. Deadlines
+    live in a heap with lazy deletion: ``deadlines`` holds the current
+    one for each room and stale heap entries are skipped.
+    """
+
+    def __init__(self):
+        self.deadlines: Dict[str, float] = {}  # room code -> loop time
+        self._heap: List[tuple] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, room_code: str, delay: float):
+        self._ensure_running()
+        deadline = asyncio.get_running_loop().time() + delay
+        self.deadlines[room_code] = deadline
+        heapq.heappush(self._heap, (deadline, room_code))
+        self._wakeup.set()
+
+    def extend(self, room_code: str, delay: float):
+        """Push a running deadline back so a late bid always gets a response window."""
+        current = self.deadlines.get(room_code)
+        if current is None:
+            return
+        deadline = asyncio.get_running_loop().time() + delay
+        if deadline > current:
+            self.deadlines[room_code] = deadline
+            heapq.heappush(self._heap, (deadline, room_code))
+
+    def cancel(self, room_code: str):
+        self.deadlines.pop(room_code, None)
+
+    def time_left(self, room_code: str) -> Optional[float]:
+        deadline = self.deadlines.get(room_code)
+        if deadline is None:
+            return None
+        return max(deadline - asyncio.get_running_loop().time(), 0.0)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            while self._heap and self._heap[0][0] <= now:
+                deadline, room_code = heapq.heappop(self._heap)
+                if self.deadlines.get(room_code) != deadline:
+                    continue
+                del self.deadlines[room_code]
+                asyncio.create_task(self._expire(room_code))
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _expire(self, room_code: str):
+        try:
+            # close_lot schedules the next lot's deadline itself
+            await auction_engine.close_lot(room_code)
+        except Exception:
+            logger.exception("Failed to close lot in room %s", room_code)
+
+lot_timer = LotTimerScheduler()
+
+# Bid broadcast coalescing
+BID_BROADCAST_COALESCE_MS = int(os.environ.get('BID_BROADCAST_COALESCE_MS', '0'))
+BID_COALESCE_MAX_LISTED = 20
+
+class BidCoalescer:
+    """Folds a room's bids into one new_bid broadcast per tick.
+
+    Clients only render the latest highest bid, so in a bid storm every
+    tick sends a single message with that bid plus how many bids it
+    folded (and the most recent of them). Rooms with a zero interval
+    broadcast every bid immediately.
+    """
+
+    def __init__(self):
+        self.pending: Dict[str, List[Bid]] = {}
+        self._ticks: Dict[str, asyncio.Task] = {}
+
+    async def add(self, room_code: str, bid: Bid, interval_ms: int):
+        self.pending.setdefault(room_code, []).append(bid)
+        if room_code not in self._ticks:
+            self._ticks[room_code] = asyncio.create_task(self._tick(room_code, interval_ms / 1000))
+
+    async def _tick(self, room_code: str, interval: float):
+        await asyncio.sleep(interval)
+        self._ticks.pop(room_code, None)
+        await self.flush(room_code)
+
+    async def flush(self, room_code: str):
+        tick = self._ticks.pop(room_code, None)
+        if tick and tick is not asyncio.current_task():
+            tick.cancel()
+        bids = self.pending.pop(room_code, None)
+        if not bids:
+            return
+        latest = bids[-1]
+        await manager.broadcast_event(room_code, {
+            "type": "new_bid",
+            "player_id": latest.player_id,
+            "amount": latest.amount,
+            "bidder_id": latest.bidder_id,
+            "folded": len(bids),
+            "bids": [
+                {"bidder_id": bid.bidder_id, "amount": bid.amount}
+                for bid in bids[-BID_COALESCE_MAX_LISTED:]
+            ]
+        })
+
+bid_coalescer = BidCoalescer()
+
 # AI Recommendation system
-async def get_player_recommendations(buyer_profile: BuyerProfile, available_players: List[Player]) -> List[str]:
+RECOMMENDATION_SHORTLIST_PER_TYPE = int(os.environ.get('RECOMMENDATION_SHORTLIST_PER_TYPE', '8'))
+RECOMMENDATION_LLM_TIMEOUT = float(os.environ.get('RECOMMENDATION_LLM_TIMEOUT', '8'))
+
+# Target squad make-up used to weigh which roles a buyer still needs
+SQUAD_ROLE_TARGETS = {'batsman': 6, 'bowler': 6, 'all-rounder': 4, 'wicket-keeper': 2}
+SQUAD_SIZE = sum(SQUAD_ROLE_TARGETS.values())
+
+def expected_price(performance_score: float, budget: float) -> float:
+    """Rough price a player should fetch for a buyer holding ``budget``.
+
+    An average (5/10) player costs an even share of the budget across a
+    full squad; better players cost more than linearly.
+    """
+    return budget / SQUAD_SIZE * (max(performance_score, 0.5) / 5) ** 1.5
+
+def max_affordable_score(price: float, budget: float) -> float:
+    """Inverse of expected_price: the best score that should still cost at most ``price``."""
+    if price <= 0:
+        return 0.0
+    return 5 * (price * SQUAD_SIZE / budget) ** (2 / 3)
+
+def shortlist_candidates(buyer_profile: BuyerProfile, index: "PlayerRankIndex",
+                         per_type: int = RECOMMENDATION_SHORTLIST_PER_TYPE) -> List[str]:
+    """IDs of the top unsold candidates per wanted role that the buyer can plausibly afford.
+
+    Roles the buyer has already filled get no slots; the roles furthest
+    from their target get twice the usual number of candidates.
+    """
+    team = set(buyer_profile.current_team)
+    filled: Dict[str, int] = {}
+    for player_id in team:
+        role = index.players.get(player_id, (None,))[0]
+        filled[role] = filled.get(role, 0) + 1
+
+    wanted = [t for t in SQUAD_ROLE_TARGETS if not buyer_profile.preferred_players or t in buyer_profile.preferred_players]
+    best_score = max_affordable_score(buyer_profile.remaining_budget, buyer_profile.budget)
+    shortlist = []
+    for role in wanted:
+        missing = SQUAD_ROLE_TARGETS[role] - filled.get(role, 0)
+        if missing <= 0:
+            continue
+        k = per_type * 2 if missing > SQUAD_ROLE_TARGETS[role] // 2 else per_type
+        # The ranked list is best first, so affordable players start at a bisect
+        ranked = index.ranked(role)
+        i = bisect.bisect_left(ranked, (-best_score, ""))
+        taken = 0
+        while i < len(ranked) and taken < k:
+            neg_score, player_id = ranked[i]
+            i += 1
+            if player_id in team or expected_price(-neg_score, buyer_profile.budget) > buyer_profile.remaining_budget:
+                continue
+            shortlist.append(player_id)
+            taken += 1
+    return shortlist
+
+def format_candidate_table(candidates: List[Player], budget: float) -> str:
+    rows = ["id,name,type,score,expected_price"]
+    for p in candidates:
+        rows.append(f"{p.id},{p.name.replace(',', ' ')},{p.player_type},{p.performance_score:.2f},{expected_price(p.performance_score, budget):.0f}")
+    return "\n".join(rows)
+
+async def get_player_recommendations(buyer_profile: BuyerProfile, candidates: List[Player]) -> List[str]:
+    # With nothing to rank the LLM call would only cost its latency
+    if not candidates:
+        RECOMMENDATION_SOURCE.inc("fallback")
+        await player_rank_index.ensure_loaded()
+        return optimize_squad(buyer_profile, player_rank_index)
     try:
         # Get LLM key from environment
         llm_key = os.environ.get('EMERGENT_LLM_KEY')
@@ -205,21 +1452,14 @@ async def get_player_recommendations(buyer_profile: BuyerProfile, available_play
             system_message="You are a cricket auction expert. Analyze player stats and buyer preferences to recommend the best players within budget."
         ).with_model("openai", "gpt-4o-mini")
         
-        # Prepare player data for AI
-        player_data = []
-        for player in available_players:
-            player_data.append({
-                "id": player.id,
-                "name": player.name,
-                "type": player.player_type,
-                "performance_score": player.performance_score,
-                "stats": player.stats.dict()
-            })
-        
+        # Only the pre-ranked shortlist goes into the prompt, as a compact table
         message = f"""
         Buyer Budget: ${buyer_profile.budget}
+        Remaining Budget: ${buyer_profile.remaining_budget}
         Preferred Player Types: {buyer_profile.preferred_players}
-        Available Players: {json.dumps(player_data, default=str)}
+        Players Already Owned: {len(buyer_profile.current_team)}
+        Candidate Players (CSV):
+        {format_candidate_table(candidates, buyer_profile.budget)}
         
         Based on the buyer's budget and preferences, recommend the top 5 players they should prioritize bidding on.
         Focus on performance scores, player types matching preferences, and value for money.
@@ -227,22 +1467,281 @@ async def get_player_recommendations(buyer_profile: BuyerProfile, available_play
         """
         
         user_message = UserMessage(text=message)
-        response = await chat.send_message(user_message)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            response = await asyncio.wait_for(chat.send_message(user_message), RECOMMENDATION_LLM_TIMEOUT)
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        finally:
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - start, outcome)
         
         # Parse AI response
         import re
         json_match = re.search(r'\[.*\]', response)
         if json_match:
-            recommended_ids = json.loads(json_match.group())
-            return recommended_ids[:5]
+            candidate_ids = {p.id for p in candidates}
+            recommended_ids = [i for i in json.loads(json_match.group()) if i in candidate_ids]
+            if recommended_ids:
+                RECOMMENDATION_SOURCE.inc("llm")
+                return recommended_ids[:5]
         
+    except asyncio.TimeoutError:
+        logger.warning("AI recommendation error: timed out")
     except Exception as e:
-        print(f"AI recommendation error: {e}")
+        logger.warning("AI recommendation error: %s", e)
     
-    # Fallback to rule-based recommendations
-    filtered_players = [p for p in available_players if not buyer_profile.preferred_players or p.player_type in buyer_profile.preferred_players]
-    sorted_players = sorted(filtered_players, key=lambda x: x.performance_score, reverse=True)
-    return [p.id for p in sorted_players[:5]]
+    # Fallback to the budget-aware squad optimizer
+    RECOMMENDATION_SOURCE.inc("fallback")
+    await player_rank_index.ensure_loaded()
+    return optimize_squad(buyer_profile, player_rank_index)
+
+# Squad optimizer
+SQUAD_OPTIMIZER_SLOTS = 5
+SQUAD_OPTIMIZER_CANDIDATES_PER_SHARE = 3
+
+class PlayerRankIndex:
+    """Unsold players per player_type, kept sorted by performance score."""
+    # Loaded on first use, then maintained as players are created and sold;
+    # a rescore drops it so it reloads with the new scores
+
+    def __init__(self):
+        self.by_type: Dict[str, List[tuple]] = {}  # type -> sorted [(-score, id)]
+        self.players: Dict[str, tuple] = {}  # id -> (type, score), sold players included
+        self.sold: Set[str] = set()
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            sold = await db.buyer_profiles.distinct("current_team")
+            players = await db.players.find({}, {"_id": 0, "id": 1, "player_type": 1, "performance_score": 1}).to_list(length=None)
+            self.by_type, self.players, self.sold = {}, {}, set(sold)
+            for player in players:
+                self.add(player["id"], player["player_type"], player.get("performance_score", 0.0))
+            self.loaded = True
+
+    def add(self, player_id: str, player_type: str, score: float):
+        self._unlink(player_id)
+        self.players[player_id] = (player_type, score)
+        if player_id not in self.sold:
+            bisect.insort(self.by_type.setdefault(player_type, []), (-score, player_id))
+
+    def mark_sold(self, player_id: str):
+        self.sold.add(player_id)
+        self._unlink(player_id)
+
+    def invalidate(self):
+        self.loaded = False
+
+    def _unlink(self, player_id: str):
+        if player_id not in self.players:
+            return
+        player_type, score = self.players[player_id]
+        ranked = self.by_type.get(player_type, [])
+        i = bisect.bisect_left(ranked, (-score, player_id))
+        if i < len(ranked) and ranked[i][1] == player_id:
+            del ranked[i]
+
+    def ranked(self, player_type: str) -> List[tuple]:
+        """Unsold players of a type as (-score, id), best first."""
+        return self.by_type.get(player_type, [])
+
+player_rank_index = PlayerRankIndex()
+
+def _role_candidates(ranked: List[tuple], buyer_profile: BuyerProfile, slots: int, skip: Set[str]) -> List[tuple]:
+    """A few of the best affordable players under each budget share (all of it, half, a third...)."""
+    # Prices rise with score, so each share is a bisect into the ranked list
+    budget = buyer_profile.remaining_budget
+    picked: Dict[str, tuple] = {}
+    for share in range(1, slots + 1):
+        best_score = max_affordable_score(budget / share, buyer_profile.budget)
+        i = bisect.bisect_left(ranked, (-best_score, ""))
+        taken = 0
+        while i < len(ranked) and taken < SQUAD_OPTIMIZER_CANDIDATES_PER_SHARE:
+            neg_score, player_id = ranked[i]
+            i += 1
+            if player_id in skip:
+                continue
+            taken += 1
+            price = expected_price(-neg_score, buyer_profile.budget)
+            if player_id not in picked and price <= budget:
+                picked[player_id] = (price, -neg_score, player_id)
+    return list(picked.values())
+
+def _pareto(entries: List[tuple]) -> List[tuple]:
+    # Keep only (cost, value, ids) entries not beaten by a cheaper-or-equal one
+    entries.sort(key=lambda e: (e[0], -e[1]))
+    kept, best = [], float("-inf")
+    for entry in entries:
+        if entry[1] > best:
+            kept.append(entry)
+            best = entry[1]
+    return kept
+
+def _knapsack_frontiers(items: List[tuple], max_count: int, budget: float) -> List[List[tuple]]:
+    """0/1 knapsack over (cost, value, id) items as Pareto frontiers per pick count."""
+    frontiers = [[(0.0, 0.0, ())]] + [[] for _ in range(max_count)]
+    for cost, value, player_id in items:
+        for k in range(max_count - 1, -1, -1):
+            grown = [(c + cost, v + value, ids + (player_id,)) for c, v, ids in frontiers[k] if c + cost <= budget]
+            if grown:
+                frontiers[k + 1] = _pareto(frontiers[k + 1] + grown)
+    return frontiers
+
+def _merge_frontiers(a: List[List[tuple]], b: List[List[tuple]], max_count: int, budget: float) -> List[List[tuple]]:
+    merged = [[] for _ in range(max_count + 1)]
+    for ka, front_a in enumerate(a):
+        for kb, front_b in enumerate(b):
+            if ka + kb > max_count:
+                break
+            merged[ka + kb].extend(
+                (ca + cb, va + vb, ia + ib)
+                for ca, va, ia in front_a for cb, vb, ib in front_b if ca + cb <= budget
+            )
+    return [_pareto(front) for front in merged]
+
+def optimize_squad(buyer_profile: BuyerProfile, index: PlayerRankIndex,
+                   slots: int = SQUAD_OPTIMIZER_SLOTS, restrict_to: Optional[Set[str]] = None) -> List[str]:
+    """Best-value affordable picks for a buyer, as a knapsack with role quotas."""
+    # Up to ``slots`` players within the remaining budget and each role's unmet
+    # target; per-role Pareto frontiers over a few candidates are then merged
+    budget = buyer_profile.remaining_budget
+    team = set(buyer_profile.current_team)
+    filled: Dict[str, int] = {}
+    for player_id in team:
+        role = index.players.get(player_id, (None,))[0]
+        filled[role] = filled.get(role, 0) + 1
+
+    total = [[(0.0, 0.0, ())]] + [[] for _ in range(slots)]
+    for role, target in SQUAD_ROLE_TARGETS.items():
+        if buyer_profile.preferred_players and role not in buyer_profile.preferred_players:
+            continue
+        quota = min(target - filled.get(role, 0), slots)
+        if quota <= 0:
+            continue
+        if restrict_to is None:
+            ranked = index.ranked(role)
+        else:
+            ranked = sorted(
+                (-index.players[p][1], p) for p in restrict_to
+                if p in index.players and index.players[p][0] == role and p not in index.sold
+            )
+        items = _role_candidates(ranked, buyer_profile, quota, team)
+        if items:
+            per_role = _knapsack_frontiers(items, quota, budget)
+            total = _merge_frontiers(total, per_role, slots, budget)
+
+    best = max((entry for front in total for entry in front), key=lambda e: (e[1], -e[0]))
+    return sorted(best[2], key=lambda player_id: index.players[player_id][1], reverse=True)
+
+# Auction simulator
+# Valuation multipliers for a role the buyer prefers, or has already filled
+SIMULATION_PREFERENCE_BOOST = 1.25
+SIMULATION_FILLED_ROLE_DISCOUNT = 0.5
+SIMULATION_LIKELY_PLAYERS = SQUAD_SIZE
+
+def simulate_auction(scores: np.ndarray, roles: np.ndarray, role_targets: np.ndarray,
+                     budgets: np.ndarray, cash: np.ndarray, preferred: np.ndarray, owned: np.ndarray,
+                     runs: int, noise: float, increment: float, rng: np.random.Generator):
+    """Play ``runs`` auctions of the lots in order; returns (winners, prices), each runs x lots."""
+    # Lots run in sequence so cash and squads carry over; each lot settles all runs
+    # at once at one increment over the runner-up (winner -1 if nobody can bid)
+    lots, buyers = len(scores), len(budgets)
+    # Buyers run along axis 0 so per-run reductions are elementwise over a few long rows
+    buyer_rows = np.arange(buyers)[:, None]
+    remaining = np.repeat(cash[:, None], runs, axis=1)
+    counts = np.repeat(owned.T[:, :, None], runs, axis=2)  # role x buyer x run
+    squad = counts.sum(axis=0)
+    values = budgets[:, None] / SQUAD_SIZE * (np.maximum(scores, 0.5) / 5) ** 1.5
+    values = values * np.where(preferred[:, roles], SIMULATION_PREFERENCE_BOOST, 1.0)
+    winners = np.full((lots, runs), -1)
+    prices = np.zeros((lots, runs))
+
+    for lot in range(lots):
+        role = roles[lot]
+        # Mean-one lognormal noise so the expected valuation stays at the base price
+        shocks = rng.standard_normal((buyers, runs), dtype=np.float32)
+        wtp = np.exp(shocks * np.float32(noise) - np.float32(noise ** 2 / 2)) * values[:, lot, None]
+        wtp[counts[role] >= role_targets[role]] *= SIMULATION_FILLED_ROLE_DISCOUNT
+        np.minimum(wtp, remaining, out=wtp)
+        wtp[squad >= SQUAD_SIZE] = 0.0
+
+        best = wtp.max(axis=0)
+        won = wtp == best
+        if np.count_nonzero(won) > runs:
+            # Ties go to the lowest buyer index
+            won &= np.cumsum(won, axis=0) == 1
+        second = np.where(won, 0.0, wtp).max(axis=0)
+        sold = best >= increment
+        price = np.where(sold, np.minimum(best, second + increment), 0.0)
+
+        won &= sold
+        remaining -= won * price
+        counts[role] += won
+        squad += won
+        winners[lot] = np.where(sold, (won * buyer_rows).sum(axis=0), -1)
+        prices[lot] = price
+    return winners.T, prices.T
+
+def summarize_simulation(lot_ids: List[str], scores: np.ndarray, buyer_ids: List[str], cash: np.ndarray,
+                         winners: np.ndarray, prices: np.ndarray) -> Dict[str, Any]:
+    runs, lots = winners.shape
+    sold = winners >= 0
+    sold_runs = sold.sum(axis=0)
+    mean_price = prices.sum(axis=0) / np.maximum(sold_runs, 1)
+    p10, p90 = np.zeros((2, lots))
+    ever_sold = sold_runs > 0
+    if ever_sold.any():
+        p10[ever_sold], p90[ever_sold] = np.nanpercentile(
+            np.where(sold, prices, np.nan)[:, ever_sold], (10, 90), axis=0)
+    # Tallies use column 0 for "unsold" and column b + 1 for buyer b
+    columns = len(buyer_ids) + 1
+    slot = winners + 1
+    per_lot = (np.arange(lots) * columns + slot).ravel()
+    win_share = np.bincount(per_lot, minlength=lots * columns).reshape(lots, columns)[:, 1:].T / runs
+    per_run = (np.arange(runs)[:, None] * columns + slot).ravel()
+
+    def mean_per_run(weights=None):
+        return np.bincount(per_run, weights, minlength=runs * columns).reshape(runs, columns)[:, 1:].mean(axis=0)
+
+    spend = mean_per_run(prices.ravel())
+    players_won = mean_per_run()
+    score_total = mean_per_run(np.broadcast_to(scores, winners.shape).ravel())
+
+    lot_summaries = []
+    for lot, player_id in enumerate(lot_ids):
+        favourites = np.argsort(-win_share[:, lot])[:3]
+        lot_summaries.append({
+            "player_id": player_id,
+            "performance_score": float(scores[lot]),
+            "unsold_probability": round(1 - float(sold_runs[lot]) / runs, 4),
+            "expected_price": round(float(mean_price[lot]), 2) if sold_runs[lot] else None,
+            "price_p10": round(float(p10[lot]), 2) if sold_runs[lot] else None,
+            "price_p90": round(float(p90[lot]), 2) if sold_runs[lot] else None,
+            "win_probability": {buyer_ids[b]: round(float(win_share[b, lot]), 4) for b in favourites if win_share[b, lot] > 0}
+        })
+
+    buyers = {}
+    for b, buyer_id in enumerate(buyer_ids):
+        likely = np.argsort(-win_share[b])[:SIMULATION_LIKELY_PLAYERS]
+        buyers[buyer_id] = {
+            "expected_spend": round(float(spend[b]), 2),
+            "expected_remaining_budget": round(float(cash[b] - spend[b]), 2),
+            "expected_players": round(float(players_won[b]), 2),
+            "expected_score_total": round(float(score_total[b]), 2),
+            "likely_players": [
+                {"player_id": lot_ids[lot], "probability": round(float(win_share[b, lot]), 4)}
+                for lot in likely if win_share[b, lot] > 0
+            ]
+        }
+    return {"lots": lot_summaries, "buyers": buyers, "expected_unsold": round(float(lots - sold_runs.sum() / runs), 2)}
 
 # Root endpoint
 @api_router.get("/")
@@ -253,7 +1752,7 @@ async def root():
 @api_router.post("/auth/register", response_model=User)
 async def register_user(user_data: UserCreate):
     # Check if user exists
-    existing_user = await db.users.find_one({"email": user_data.email})
+    existing_user = await user_cache.get("email", user_data.email)
     if existing_user:
         raise HTTPException(status_code=400, detail="User already exists")
     
@@ -263,12 +1762,17 @@ async def register_user(user_data: UserCreate):
         user_type=user_data.user_type
     )
     
-    await db.users.insert_one(user.dict())
+    try:
+        await db.users.insert_one(user.dict())
+    except DuplicateKeyError:
+        # A concurrent registration won the unique email index
+        raise HTTPException(status_code=400, detail="User already exists")
+    user_cache.invalidate("email", user.email)
     return user
 
 @api_router.post("/auth/login", response_model=User)
 async def login_user(login_data: UserLogin):
-    user = await db.users.find_one({"email": login_data.email})
+    user = await user_cache.get("email", login_data.email)
     if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
     
@@ -278,33 +1782,291 @@ async def login_user(login_data: UserLogin):
 @api_router.post("/players", response_model=Player)
 async def create_player(player_data: PlayerCreate, host_id: str):
     # Verify host exists
-    host = await db.users.find_one({"id": host_id, "user_type": "host"})
-    if not host:
+    if not await is_host(host_id):
         raise HTTPException(status_code=403, detail="Only hosts can create players")
     
     player = Player(**player_data.dict())
     player.performance_score = calculate_performance_score(player.stats, player.player_type)
     
     await db.players.insert_one(player.dict())
+    recommendation_cache.invalidate()
+    if player_rank_index.loaded:
+        player_rank_index.add(player.id, player.player_type, player.performance_score)
     return player
 
+PLAYER_PAGE_SIZE = 100
+PLAYER_PAGE_MAX = 500
+PLAYER_STAT_FIELDS = {name for name, field in PlayerStats.model_fields.items() if field.annotation in (int, float)}
+
+def encode_player_cursor(player: Dict[str, Any]) -> str:
+    raw = json.dumps([player["performance_score"], player["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_player_cursor(cursor: str):
+    try:
+        score, player_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(score), str(player_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def build_player_filter(player_type: Optional[str], min_score: Optional[float],
+                        max_score: Optional[float], stat: List[str]) -> Dict[str, Any]:
+    query: Dict[str, Any] = {}
+    if player_type:
+        query["player_type"] = player_type
+    score_range = {}
+    if min_score is not None:
+        score_range["$gte"] = min_score
+    if max_score is not None:
+        score_range["$lte"] = max_score
+    if score_range:
+        query["performance_score"] = score_range
+    # stat filters look like "strike_rate:120:" or "economy_rate::7.5"
+    for spec in stat:
+        name, _, bounds = spec.partition(":")
+        low, _, high = bounds.partition(":")
+        if name not in PLAYER_STAT_FIELDS:
+            raise HTTPException(status_code=400, detail=f"Unknown stat filter: {name}")
+        stat_range = {}
+        try:
+            if low:
+                stat_range["$gte"] = float(low)
+            if high:
+                stat_range["$lte"] = float(high)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid range for stat: {name}")
+        if stat_range:
+            query[f"stats.{name}"] = stat_range
+    return query
+
+async def fetch_players(player_ids: List[str], projection: Dict[str, int] = PLAYER_PROJECTION,
+                        keep_missing: bool = False) -> List[Optional[Dict[str, Any]]]:
+    """Resolve player IDs with one ``$in`` query, keeping request order.
+
+    Unknown IDs are skipped, or with ``keep_missing`` left as None so the
+    result stays aligned with ``player_ids`` (a room's lots by index).
+    """
+    unique_ids = list(dict.fromkeys(player_ids))
+    if not unique_ids:
+        return []
+    players = await db.players.find({"id": {"$in": unique_ids}}, projection).to_list(length=len(unique_ids))
+    by_id = {player["id"]: player for player in players}
+    if keep_missing:
+        return [by_id.get(player_id) for player_id in player_ids]
+    return [by_id[player_id] for player_id in unique_ids if player_id in by_id]
+
+def json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def json_response(content: Any, request: Optional[Request] = None, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serialize documents this server wrote straight to the wire, skipping model re-validation.
+
+    Only for documents read with a model projection, so their shape already
+    matches the ``response_model``. Given the ``request``, the body hash is
+    sent as an ETag and a matching ``If-None-Match`` gets an empty 304.
+    """
+    body = orjson.dumps(content, default=json_default)
+    headers = dict(headers or {})
+    if request is not None:
+        etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        headers["ETag"] = etag
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (if_none_match.strip() == "*" or etag in (
+                tag.strip().removeprefix("W/") for tag in if_none_match.split(","))):
+            return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+async def stream_players_ndjson(cursor):
+    async for player in cursor:
+        yield orjson.dumps(player, default=json_default) + b"\n"
+
+PLAYER_IMPORT_BATCH_SIZE = 500
+PLAYER_IMPORT_MAX_ERRORS = 100
+
+def parse_player_rows(upload: UploadFile, fmt: str):
+    """Yield (row number, PlayerCreate-shaped dict, error) from a CSV or NDJSON upload.
+
+    CSV rows use flat columns (name, player_type, profile_picture and the
+    PlayerStats field names); NDJSON rows use the PlayerCreate JSON shape.
+    A line that is not a JSON object yields a None row and an error message.
+    """
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig")
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            stats = {name: value for name, value in row.items() if name in PlayerStats.model_fields and value not in (None, "")}
+            yield number, {
+                "name": row.get("name"),
+                "player_type": row.get("player_type"),
+                "profile_picture": row.get("profile_picture") or None,
+                "stats": stats
+            }, None
+    else:
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, None, f"Invalid JSON: {e}"
+                continue
+            if isinstance(row, dict):
+                yield number, row, None
+            else:
+                yield number, None, "Expected a JSON object"
+
+async def insert_player_batch(batch: List[PlayerCreate]) -> int:
+    players = [Player(**player_data.dict()) for player_data in batch]
+    scores = calculate_performance_scores([p.stats for p in players], [p.player_type for p in players])
+    for player, score in zip(players, scores):
+        player.performance_score = float(score)
+    await db.players.insert_many([player.dict() for player in players], ordered=True)
+    if player_rank_index.loaded:
+        for player in players:
+            player_rank_index.add(player.id, player.player_type, player.performance_score)
+    return len(players)
+
+@api_router.post("/players/import")
+async def import_players(host_id: str, file: UploadFile = File(...),
+                         fmt: Optional[str] = Query(None, alias="format", pattern="^(csv|ndjson)$")):
+    if not await is_host(host_id):
+        raise HTTPException(status_code=403, detail="Only hosts can create players")
+
+    if fmt is None:
+        fmt = "ndjson" if (file.filename or "").lower().endswith((".ndjson", ".jsonl")) else "csv"
+
+    inserted = 0
+    errors = []
+    error_count = 0
+    batch: List[PlayerCreate] = []
+    complete = True
+    number = 0
+    rows = parse_player_rows(file, fmt)
+    while True:
+        try:
+            number, row, error = next(rows)
+        except StopIteration:
+            break
+        except (ValueError, csv.Error) as e:
+            # The reader cannot resume past undecodable bytes or broken quoting;
+            # keep the rows read so far and report the first row not read
+            complete = False
+            error_count += 1
+            errors.append({"row": number + 1, "error": f"Unreadable {fmt} upload: {e}"})
+            break
+        if error is None:
+            try:
+                batch.append(PlayerCreate(**row))
+            except (ValidationError, TypeError) as e:
+                error = str(e)
+        if error is not None:
+            error_count += 1
+            if len(errors) < PLAYER_IMPORT_MAX_ERRORS:
+                errors.append({"row": number, "error": error})
+            continue
+        if len(batch) >= PLAYER_IMPORT_BATCH_SIZE:
+            inserted += await insert_player_batch(batch)
+            batch = []
+    if batch:
+        inserted += await insert_player_batch(batch)
+    if inserted:
+        recommendation_cache.invalidate()
+
+    return {"inserted": inserted, "error_count": error_count, "errors": errors, "complete": complete}
+
+@api_router.post("/players/rescore")
+async def rescore_players(host_id: str):
+    """Recompute every stored performance score, e.g. after the scoring weights change."""
+    if not await is_host(host_id):
+        raise HTTPException(status_code=403, detail="Only hosts can rescore players")
+
+    updated = 0
+    cursor = db.players.find({}, {"_id": 0, "id": 1, "player_type": 1, "stats": 1}, batch_size=PLAYER_IMPORT_BATCH_SIZE)
+    while True:
+        docs = await cursor.to_list(length=PLAYER_IMPORT_BATCH_SIZE)
+        if not docs:
+            break
+        scores = calculate_performance_scores(
+            [PlayerStats(**doc.get("stats", {})) for doc in docs],
+            [doc.get("player_type") for doc in docs]
+        )
+        await db.players.bulk_write([
+            UpdateOne({"id": doc["id"]}, {"$set": {"performance_score": float(score)}})
+            for doc, score in zip(docs, scores)
+        ], ordered=False)
+        updated += len(docs)
+    recommendation_cache.invalidate()
+    player_rank_index.invalidate()
+    return {"updated": updated}
+
 @api_router.get("/players", response_model=List[Player])
-async def get_players():
-    players = await db.players.find().to_list(length=None)
-    return [Player(**player) for player in players]
+async def get_players(
+    request: Request,
+    limit: int = Query(PLAYER_PAGE_SIZE, ge=1, le=PLAYER_PAGE_MAX),
+    cursor: Optional[str] = None,
+    player_type: Optional[str] = None,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    stat: List[str] = Query([]),
+    sort: str = Query("-performance_score", pattern="^-?performance_score$"),
+    output: str = Query("json", alias="format", pattern="^(json|ndjson)$"),
+    ids: Optional[str] = None,
+):
+    """Players ordered by performance score, one keyset page at a time.
+
+    The next page's cursor is returned in the ``X-Next-Cursor`` header.
+    ``format=ndjson`` streams every matching player instead, for exports.
+    ``ids=a,b,c`` looks up exactly those players, in that order.
+    """
+    if ids is not None:
+        players = await fetch_players([player_id for player_id in ids.split(",") if player_id])
+        return json_response(players, request)
+
+    query = build_player_filter(player_type, min_score, max_score, stat)
+    # Keyset order is (performance_score, id) with id running opposite to the
+    # score so both directions walk the same index
+    direction = DESCENDING if sort.startswith("-") else ASCENDING
+    sort_spec = [("performance_score", direction), ("id", -direction)]
+
+    if output == "ndjson":
+        players = db.players.find(query, PLAYER_PROJECTION, sort=sort_spec, batch_size=PLAYER_PAGE_MAX)
+        return StreamingResponse(stream_players_ndjson(players), media_type="application/x-ndjson")
+
+    if cursor:
+        score, player_id = decode_player_cursor(cursor)
+        past_score = "$lt" if direction == DESCENDING else "$gt"
+        past_id = "$gt" if direction == DESCENDING else "$lt"
+        keyset = {"$or": [
+            {"performance_score": {past_score: score}},
+            {"performance_score": score, "id": {past_id: player_id}}
+        ]}
+        query = {"$and": [query, keyset]} if query else keyset
+
+    # One extra row tells us whether another page exists
+    players = await db.players.find(query, PLAYER_PROJECTION, sort=sort_spec, limit=limit + 1).to_list(length=limit + 1)
+    headers = {}
+    if len(players) > limit:
+        players = players[:limit]
+        headers["X-Next-Cursor"] = encode_player_cursor(players[-1])
+    return json_response(players, request, headers)
+
+@api_router.post("/players/batch", response_model=List[Player])
+async def get_players_batch(batch: PlayerBatchRequest):
+    return json_response(await fetch_players(batch.ids))
 
 @api_router.get("/players/{player_id}", response_model=Player)
-async def get_player(player_id: str):
-    player = await db.players.find_one({"id": player_id})
+async def get_player(player_id: str, request: Request):
+    player = await db.players.find_one({"id": player_id}, PLAYER_PROJECTION)
     if not player:
         raise HTTPException(status_code=404, detail="Player not found")
-    return Player(**player)
+    return json_response(player, request)
 
 # Buyer profile endpoints
 @api_router.post("/buyer-profile", response_model=BuyerProfile)
 async def create_buyer_profile(profile_data: BuyerProfileCreate, user_id: str):
     # Check if profile already exists
-    existing_profile = await db.buyer_profiles.find_one({"user_id": user_id})
+    existing_profile = await buyer_profile_cache.get("user_id", user_id)
     if existing_profile:
         # Update existing profile
         await db.buyer_profiles.update_one(
@@ -315,7 +2077,9 @@ async def create_buyer_profile(profile_data: BuyerProfileCreate, user_id: str):
                 "remaining_budget": profile_data.budget
             }}
         )
-        updated_profile = await db.buyer_profiles.find_one({"user_id": user_id})
+        buyer_profile_cache.invalidate("user_id", user_id)
+        auction_engine.forget_budget(user_id)
+        updated_profile = await buyer_profile_cache.get("user_id", user_id)
         return BuyerProfile(**updated_profile)
     
     profile = BuyerProfile(
@@ -326,72 +2090,211 @@ async def create_buyer_profile(profile_data: BuyerProfileCreate, user_id: str):
     )
     
     await db.buyer_profiles.insert_one(profile.dict())
+    buyer_profile_cache.invalidate("user_id", user_id)
     return profile
 
 @api_router.get("/buyer-profile/{user_id}", response_model=BuyerProfile)
 async def get_buyer_profile(user_id: str):
-    profile = await db.buyer_profiles.find_one({"user_id": user_id})
+    profile = await buyer_profile_cache.get("user_id", user_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
-    return BuyerProfile(**profile)
+    return json_response(profile)
 
 @api_router.get("/buyer-profile/{user_id}/recommendations")
 async def get_recommendations(user_id: str):
-    profile = await db.buyer_profiles.find_one({"user_id": user_id})
+    profile = await buyer_profile_cache.get("user_id", user_id)
     if not profile:
         raise HTTPException(status_code=404, detail="Profile not found")
     
     buyer_profile = BuyerProfile(**profile)
-    players = await db.players.find().to_list(length=None)
-    available_players = [Player(**player) for player in players]
-    
-    recommendations = await get_player_recommendations(buyer_profile, available_players)
+
+    async def compute():
+        # Only the shortlisted players' documents are read, not the catalog
+        await player_rank_index.ensure_loaded()
+        shortlist = shortlist_candidates(buyer_profile, player_rank_index)
+        candidates = [Player(**player) for player in await fetch_players(shortlist)]
+        return await get_player_recommendations(buyer_profile, candidates)
+
+    recommendations = await recommendation_cache.get_or_compute(recommendation_cache.key(buyer_profile), compute)
     
     # Update profile with recommendations
-    await db.buyer_profiles.update_one(
-        {"user_id": user_id},
-        {"$set": {"recommended_players": recommendations}}
-    )
+    if recommendations != buyer_profile.recommended_players:
+        await db.buyer_profiles.update_one(
+            {"user_id": user_id},
+            {"$set": {"recommended_players": recommendations}}
+        )
+        buyer_profile_cache.invalidate("user_id", user_id)
     
     return {"recommended_players": recommendations}
 
 # Auction room endpoints
 @api_router.post("/auction-rooms", response_model=AuctionRoom)
 async def create_auction_room(room_data: AuctionRoomCreate, host_id: str):
-    host = await db.users.find_one({"id": host_id, "user_type": "host"})
-    if not host:
+    if not await is_host(host_id):
         raise HTTPException(status_code=403, detail="Only hosts can create auction rooms")
     
     room = AuctionRoom(
         host_id=host_id,
-        room_name=room_data.room_name
+        room_name=room_data.room_name,
+        bid_coalesce_ms=room_data.bid_coalesce_ms
     )
     
     await db.auction_rooms.insert_one(room.dict())
+    room_cache.invalidate("room_code", room.room_code)
     return room
 
 @api_router.get("/auction-rooms/{room_code}", response_model=AuctionRoom)
-async def get_auction_room(room_code: str):
-    room = await db.auction_rooms.find_one({"room_code": room_code})
+async def get_auction_room(room_code: str, request: Request):
+    room = await room_cache.get("room_code", room_code)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    return json_response(room, request)
+
+@api_router.get("/auction-rooms/{room_code}/players", response_model=List[Optional[Player]])
+async def get_auction_room_players(room_code: str, request: Request):
+    """The room's lots in order; a lot whose player no longer exists is null."""
+    room = await room_cache.get("room_code", room_code)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    return json_response(await fetch_players(room.get("players", []), keep_missing=True), request)
+
+@api_router.get("/auction-rooms/{room_code}/recommendations")
+async def get_room_recommendations(room_code: str):
+    """Optimizer picks from the room's remaining lots for every buyer in the room."""
+    room = await room_cache.get("room_code", room_code)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    
+    remaining_lots = set(room.get("players", [])[room.get("current_player_index", 0):])
+    profiles = await db.buyer_profiles.find(
+        {"user_id": {"$in": room.get("buyers", [])}}, BUYER_PROFILE_PROJECTION
+    ).to_list(length=None)
+    await player_rank_index.ensure_loaded()
+    
+    return {
+        "recommendations": {
+            profile["user_id"]: optimize_squad(BuyerProfile(**profile), player_rank_index, restrict_to=remaining_lots)
+            for profile in profiles
+        }
+    }
+
+@api_router.post("/auction-rooms/{room_code}/simulate")
+async def simulate_room(room_code: str, request: SimulationRequest):
+    """Monte Carlo forecast of prices, squads and unsold risk for the room's lots and buyers."""
+    room = await room_cache.get("room_code", room_code)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
-    return AuctionRoom(**room)
+
+    lot_ids = request.lot_order if request.lot_order is not None else room.get("players", [])
+    players = await fetch_players(lot_ids, {"_id": 0, "id": 1, "player_type": 1, "performance_score": 1})
+    if len(players) != len(set(lot_ids)):
+        raise HTTPException(status_code=400, detail="Unknown player in lot order")
+    profiles = await db.buyer_profiles.find(
+        {"user_id": {"$in": room.get("buyers", [])}}, BUYER_PROFILE_PROJECTION
+    ).to_list(length=None)
+    if not profiles:
+        raise HTTPException(status_code=400, detail="Room has no buyers with a profile")
+
+    role_names = list(SQUAD_ROLE_TARGETS)
+    role_names += sorted({player["player_type"] for player in players} - set(role_names))
+    role_index = {role: i for i, role in enumerate(role_names)}
+    # Roles outside the squad template never count as filled
+    role_targets = np.array([SQUAD_ROLE_TARGETS.get(role, SQUAD_SIZE) for role in role_names])
+    scores = np.array([player.get("performance_score", 0.0) for player in players])
+    roles = np.array([role_index[player["player_type"]] for player in players], dtype=int)
+
+    buyer_ids = [profile["user_id"] for profile in profiles]
+    budgets = np.array([profile["budget"] for profile in profiles], dtype=float)
+    cash = np.array([request.budgets.get(profile["user_id"], profile["remaining_budget"]) for profile in profiles], dtype=float)
+    preferred = np.zeros((len(profiles), len(role_names)), dtype=bool)
+    owned = np.zeros((len(profiles), len(role_names)), dtype=int)
+    await player_rank_index.ensure_loaded()
+    for b, profile in enumerate(profiles):
+        for role in profile.get("preferred_players", []):
+            if role in role_index:
+                preferred[b, role_index[role]] = True
+        for player_id in profile.get("current_team", []):
+            player = player_rank_index.players.get(player_id)
+            if player and player[0] in role_index:
+                owned[b, role_index[player[0]]] += 1
+
+    increment = request.bid_increment
+    if increment is None:
+        increment = 0.01 * budgets.mean() / SQUAD_SIZE
+
+    def forecast() -> Dict[str, Any]:
+        winners, prices = simulate_auction(
+            scores, roles, role_targets, budgets, cash, preferred, owned,
+            request.runs, request.noise, increment, np.random.default_rng(request.seed)
+        )
+        return summarize_simulation([player["id"] for player in players], scores, buyer_ids, cash, winners, prices)
+
+    start = time.perf_counter()
+    # NumPy work runs in a thread so large simulations do not stall live auctions
+    summary = await asyncio.to_thread(forecast)
+    return json_response({
+        "runs": request.runs,
+        "bid_increment": increment,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        **summary
+    })
+
+AUCTION_RESULTS_BEST_VALUE = 10
+
+@api_router.get("/auction-rooms/{room_code}/results")
+async def get_auction_results(room_code: str, request: Request):
+    """Sold and unsold lots, per-buyer spend and a leaderboard, from the room's materialized results."""
+    room = await room_cache.get("room_code", room_code)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+
+    results = room.get("results") or {}
+    sold = sorted(
+        ({"player_id": player_id, **lot} for player_id, lot in results.get("sold", {}).items()),
+        key=lambda lot: lot["lot_index"]
+    )
+    leaderboard = sorted(
+        ({
+            "buyer_id": buyer_id,
+            **totals,
+            # Price paid per performance-score point: lower is better value
+            "price_per_point": totals["spent"] / totals["score_total"] if totals.get("score_total") else None
+        } for buyer_id, totals in results.get("buyers", {}).items()),
+        key=lambda buyer: (-buyer["score_total"], buyer["spent"])
+    )
+    best_value = sorted(
+        (lot for lot in sold if lot["price"] > 0),
+        key=lambda lot: lot["performance_score"] / lot["price"], reverse=True
+    )[:AUCTION_RESULTS_BEST_VALUE]
+
+    return json_response({
+        "auction_status": room.get("auction_status"),
+        "lots_total": len(room.get("players", [])),
+        "lots_closed": results.get("lots_closed", 0),
+        "total_spent": results.get("total_spent", 0.0),
+        "sold": sold,
+        "unsold": results.get("unsold", []),
+        "leaderboard": leaderboard,
+        "best_value": best_value
+    }, request)
 
 @api_router.post("/auction-rooms/{room_code}/add-player")
 async def add_player_to_room(room_code: str, player_id: str, host_id: str):
-    room = await db.auction_rooms.find_one({"room_code": room_code, "host_id": host_id})
-    if not room:
+    room = await room_cache.get("room_code", room_code)
+    if not room or room.get("host_id") != host_id:
         raise HTTPException(status_code=404, detail="Room not found or unauthorized")
     
     await db.auction_rooms.update_one(
         {"room_code": room_code},
         {"$addToSet": {"players": player_id}}
     )
+    room_cache.invalidate("room_code", room_code)
+    auction_engine.add_player(room_code, player_id)
     return {"success": True}
 
 @api_router.post("/auction-rooms/{room_code}/join")
 async def join_auction_room(room_code: str, user_id: str):
-    room = await db.auction_rooms.find_one({"room_code": room_code})
+    room = await room_cache.get("room_code", room_code)
     if not room:
         raise HTTPException(status_code=404, detail="Room not found")
     
@@ -399,147 +2302,223 @@ async def join_auction_room(room_code: str, user_id: str):
         {"room_code": room_code},
         {"$addToSet": {"buyers": user_id}}
     )
+    room_cache.invalidate("room_code", room_code)
     return {"success": True}
 
 @api_router.post("/auction-rooms/{room_code}/start")
 async def start_auction(room_code: str, host_id: str):
-    room = await db.auction_rooms.find_one({"room_code": room_code, "host_id": host_id})
-    if not room:
+    room = await room_cache.get("room_code", room_code)
+    if not room or room.get("host_id") != host_id:
         raise HTTPException(status_code=404, detail="Room not found or unauthorized")
     
-    await db.auction_rooms.update_one(
-        {"room_code": room_code},
+    # A room runs once: awards, bid buckets and archived ladders are keyed by
+    # lot index, so a rerun would mix with (or hide behind) the first run's
+    started = await db.auction_rooms.update_one(
+        {"room_code": room_code, "auction_status": "waiting"},
         {"$set": {
             "auction_status": "active",
             "auction_start_time": datetime.now(timezone.utc),
             "current_player_index": 0,
             "current_highest_bid": 0.0,
-            "current_highest_bidder": None
+            "current_highest_bidder": None,
+            "results": {}
         }}
     )
+    if not started.matched_count:
+        raise HTTPException(status_code=400, detail="Auction already started")
+    room_cache.invalidate("room_code", room_code)
+    auction_engine.forget(room_code)
+    state = await auction_engine.get_room(room_code=room_code)
+    lot_timer.schedule(room_code, state.bid_timer)
     
     # Broadcast to all connected clients
-    await manager.broadcast_to_room(
-        json.dumps({"type": "auction_started", "room_code": room_code}),
-        room_code
+    await manager.broadcast_event(
+        room_code,
+        {"type": "auction_started", "room_code": room_code, "bid_timer": state.bid_timer}
     )
     
     return {"success": True, "message": "Auction started"}
 
 # Bidding endpoints
+async def announce_bid(state: RoomAuctionState, bid: Bid):
+    if state.bid_coalesce_ms > 0:
+        await bid_coalescer.add(state.room_code, bid, state.bid_coalesce_ms)
+        return
+    # Broadcast bid to all room participants
+    await manager.broadcast_event(state.room_code, {
+        "type": "new_bid",
+        "player_id": bid.player_id,
+        "amount": bid.amount,
+        "bidder_id": bid.bidder_id
+    })
+
 @api_router.post("/bids")
 async def place_bid(bid_data: BidCreate, bidder_id: str):
-    # Verify room and auction status
-    room = await db.auction_rooms.find_one({"id": bid_data.room_id, "auction_status": "active"})
-    if not room:
-        raise HTTPException(status_code=400, detail="Auction not active")
-    
-    # Check if bid is higher than current highest
-    if bid_data.amount <= room.get("current_highest_bid", 0):
-        raise HTTPException(status_code=400, detail="Bid must be higher than current highest bid")
-    
-    # Check buyer's budget
-    profile = await db.buyer_profiles.find_one({"user_id": bidder_id})
-    if not profile or profile.get("remaining_budget", 0) < bid_data.amount:
-        raise HTTPException(status_code=400, detail="Insufficient budget")
-    
-    # Create bid
-    bid = Bid(
-        room_id=bid_data.room_id,
-        player_id=bid_data.player_id,
-        bidder_id=bidder_id,
-        amount=bid_data.amount
-    )
-    
-    await db.bids.insert_one(bid.dict())
-    
-    # Update room with new highest bid
-    await db.auction_rooms.update_one(
-        {"id": bid_data.room_id},
-        {"$set": {
-            "current_highest_bid": bid_data.amount,
-            "current_highest_bidder": bidder_id
-        }}
-    )
-    
-    # Broadcast bid to all room participants
-    room_code = room.get("room_code")
-    await manager.broadcast_to_room(
-        json.dumps({
-            "type": "new_bid",
-            "player_id": bid_data.player_id,
-            "amount": bid_data.amount,
-            "bidder_id": bidder_id
-        }),
-        room_code
-    )
+    try:
+        await auction_engine.place_bid(bid_data.room_id, bidder_id, bid_data.player_id, bid_data.amount)
+    except BidRejected as e:
+        raise HTTPException(status_code=400, detail=e.detail)
     
     return {"success": True}
 
+@api_router.get("/bids/log-stats")
+async def get_bid_log_stats():
+    return {**bid_log.stats, "pending": bid_log.pending}
+
+@api_router.post("/bids/archive")
+async def archive_bids(host_id: str):
+    """Compact the bid history of every completed room now instead of waiting for the next run."""
+    if not await is_host(host_id):
+        raise HTTPException(status_code=403, detail="Only hosts can archive bids")
+    return {"archived_rooms": await bid_archiver.archive_completed_rooms()}
+
+BID_HISTORY_PAGE_SIZE = 50
+BID_HISTORY_PAGE_MAX = 500
+
+def encode_bid_cursor(amount: float) -> str:
+    return base64.urlsafe_b64encode(json.dumps(amount).encode()).decode()
+
+def decode_bid_cursor(cursor: str) -> float:
+    try:
+        return float(json.loads(base64.urlsafe_b64decode(cursor.encode())))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def read_bid_ladder(room: Dict[str, Any], lot_index: int, after: Optional[float], limit: int) -> List[Dict[str, Any]]:
+    """Up to ``limit`` bids of one lot above ``after``, lowest first."""
+    if room.get("bids_archived"):
+        lot = await db.bid_archive.find_one({"room_id": room["id"], "lot_index": lot_index}, {"_id": 0})
+        if not lot:
+            return []
+        start = bisect.bisect_right(lot["amount"], after) if after is not None else 0
+        return [
+            {"bidder_id": lot["bidders"][bidder], "amount": amount, "timestamp": timestamp}
+            for bidder, amount, timestamp in list(zip(lot["bidder"], lot["amount"], lot["timestamp"]))[start:start + limit]
+        ]
+
+    query: Dict[str, Any] = {"room_id": room["id"], "lot_index": lot_index}
+    if after is not None:
+        query["last_amount"] = {"$gt": after}
+    bids: List[Dict[str, Any]] = []
+    # Buckets are read in first_amount order; once the next bucket starts
+    # above the limit-th bid found so far, it cannot change the page
+    async for bucket in db.bid_buckets.find(query, {"_id": 0, "first_amount": 1, "bids": 1}, sort=[("first_amount", ASCENDING)]):
+        if len(bids) >= limit and bucket["first_amount"] > bids[limit - 1]["amount"]:
+            break
+        bids.extend(bid for bid in bucket["bids"] if after is None or bid["amount"] > after)
+        bids.sort(key=lambda bid: bid["amount"])
+    return bids[:limit]
+
+@api_router.get("/auction-rooms/{room_code}/bids")
+async def get_bid_history(
+    room_code: str,
+    lot_index: Optional[int] = Query(None, ge=0),
+    player_id: Optional[str] = None,
+    limit: int = Query(BID_HISTORY_PAGE_SIZE, ge=1, le=BID_HISTORY_PAGE_MAX),
+    cursor: Optional[str] = None,
+):
+    """The bid ladder of one lot, lowest bid first, one keyset page at a time.
+
+    The lot is ``lot_index``, or the lot of ``player_id``, or else the
+    current lot. The next page's cursor is returned in ``X-Next-Cursor``.
+    """
+    room = await room_cache.get("room_code", room_code)
+    if not room:
+        raise HTTPException(status_code=404, detail="Room not found")
+    players = room.get("players", [])
+    if lot_index is None and player_id is not None:
+        if player_id not in players:
+            raise HTTPException(status_code=404, detail="Player not in this room")
+        lot_index = players.index(player_id)
+    elif lot_index is None:
+        lot_index = room.get("current_player_index", 0)
+
+    after = decode_bid_cursor(cursor) if cursor else None
+    bids = await read_bid_ladder(room, lot_index, after, limit + 1)
+    headers = {}
+    if len(bids) > limit:
+        bids = bids[:limit]
+        headers["X-Next-Cursor"] = encode_bid_cursor(bids[-1]["amount"])
+    return json_response({
+        "lot_index": lot_index,
+        "player_id": players[lot_index] if lot_index < len(players) else None,
+        "bids": bids
+    }, headers=headers)
+
+# Metrics endpoint
+@api_router.get("/metrics")
+async def get_metrics():
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # WebSocket endpoint
+def room_snapshot(state: RoomAuctionState, user_id: str, seq: int) -> Dict[str, Any]:
+    """Everything a reconnecting client needs, built from in-memory state only."""
+    return {
+        "type": "snapshot",
+        "seq": seq,
+        "room_code": state.room_code,
+        "auction_status": state.auction_status,
+        "players": state.players,
+        "current_player_index": state.current_player_index,
+        "player_id": state.current_player,
+        "current_highest_bid": state.current_highest_bid,
+        "current_highest_bidder": state.current_highest_bidder,
+        "bid_timer": state.bid_timer,
+        "time_left": lot_timer.time_left(state.room_code),
+        "remaining_budget": auction_engine.budgets.get(user_id)
+    }
+
+async def handle_socket_bid(websocket: WebSocket, room_code: str, user_id: str, message: Dict[str, Any]):
+    """Place a bid sent over the room socket and answer the bidder with an ack or reject.
+
+    Expects ``{"type": "bid", "client_bid_id": ..., "amount": ..., "player_id": ...}``.
+    """
+    reply = {"type": "bid_ack", "client_bid_id": message.get("client_bid_id")}
+    state = await auction_engine.get_room(room_code=room_code)
+    try:
+        if not state:
+            raise BidRejected("Room not found")
+        amount = float(message["amount"])
+        if not math.isfinite(amount):
+            raise BidRejected("Bid amount must be a finite number")
+        player_id = message["player_id"]
+        if not isinstance(player_id, str):
+            raise TypeError("player_id")
+        state, _ = await auction_engine.place_bid(state.room_id, user_id, player_id, amount)
+    except BidRejected as e:
+        reply.update(type="bid_reject", reason=e.detail)
+    except (KeyError, TypeError, ValueError):
+        reply.update(type="bid_reject", reason="Malformed bid")
+
+    if state:
+        reply["highest_bid"] = state.current_highest_bid
+        reply["highest_bidder"] = state.current_highest_bidder
+    await manager.send_personal_message(json.dumps(reply), websocket)
+
 @app.websocket("/ws/{room_code}/{user_id}")
-async def websocket_endpoint(websocket: WebSocket, room_code: str, user_id: str):
+async def websocket_endpoint(websocket: WebSocket, room_code: str, user_id: str, since: Optional[int] = None):
+    # Load room state before joining so catch-up is queued ahead of any live event
+    state = await auction_engine.get_room(room_code=room_code) if since is not None else None
     await manager.connect(websocket, room_code, user_id)
+    if since is not None and not manager.replay(websocket, room_code, since) and state:
+        # Gap too large for the buffer or the outbox (or unknown after a restart):
+        # one compact snapshot instead
+        seq = manager.event_log(room_code).delivered_seq
+        await manager.send_personal_message(json.dumps(room_snapshot(state, user_id, seq)), websocket)
     try:
         while True:
             data = await websocket.receive_text()
             message = json.loads(data)
             
-            if message["type"] == "bid_timer_end":
-                # Handle bid timer completion
-                room = await db.auction_rooms.find_one({"room_code": room_code})
-                if room and room.get("auction_status") == "active":
-                    current_player_index = room.get("current_player_index", 0)
-                    players = room.get("players", [])
-                    
-                    if current_player_index < len(players):
-                        # Award player to highest bidder
-                        highest_bidder = room.get("current_highest_bidder")
-                        highest_bid = room.get("current_highest_bid", 0)
-                        current_player = players[current_player_index]
-                        
-                        if highest_bidder and highest_bid > 0:
-                            # Update buyer profile
-                            await db.buyer_profiles.update_one(
-                                {"user_id": highest_bidder},
-                                {
-                                    "$push": {"current_team": current_player},
-                                    "$inc": {"remaining_budget": -highest_bid}
-                                }
-                            )
-                        
-                        # Move to next player
-                        next_index = current_player_index + 1
-                        if next_index >= len(players):
-                            # Auction complete
-                            await db.auction_rooms.update_one(
-                                {"room_code": room_code},
-                                {"$set": {"auction_status": "completed"}}
-                            )
-                            await manager.broadcast_to_room(
-                                json.dumps({"type": "auction_completed"}),
-                                room_code
-                            )
-                        else:
-                            # Next player
-                            await db.auction_rooms.update_one(
-                                {"room_code": room_code},
-                                {"$set": {
-                                    "current_player_index": next_index,
-                                    "current_highest_bid": 0.0,
-                                    "current_highest_bidder": None
-                                }}
-                            )
-                            await manager.broadcast_to_room(
-                                json.dumps({
-                                    "type": "next_player",
-                                    "player_index": next_index,
-                                    "player_id": players[next_index] if next_index < len(players) else None
-                                }),
-                                room_code
-                            )
+            if message["type"] == "bid":
+                await handle_socket_bid(websocket, room_code, user_id, message)
+            elif message["type"] == "bid_timer_end":
+                # Lots are closed server-side by lot_timer; ignored for older clients
+                continue
             
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket, room_code)
 
 # Include the router in the main app
@@ -551,7 +2530,9 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+app.add_middleware(MetricsMiddleware)
 
 # Configure logging
 logging.basicConfig(
@@ -560,6 +2541,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    await ensure_indexes()
+
+@app.on_event("startup")
+async def start_bid_archiver():
+    bid_archiver.start()
+
+@app.on_event("startup")
+async def resume_lot_timers():
+    # Rooms that were live when the process stopped get a fresh lot window.
+    # This assumes a single worker: every worker would otherwise close each lot.
+    async for room in db.auction_rooms.find({"auction_status": "active"}, {"_id": 0, "room_code": 1, "bid_timer": 1}):
+        lot_timer.schedule(room["room_code"], room.get("bid_timer", 5))
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await lot_timer.stop()
+    await bid_log.stop()
+    await bid_archiver.stop()
     client.close()
\ No newline at end of file
@@ -0,0 +1,380 @@
+"""Load test for the auction hot paths.
+
+Runs the FastAPI ``app`` from backend/server.py in-process against a local
+Mongo stand-in (mongomock-motor by default, or a real mongod via --mongo-url)
+and drives it with simulated WebSocket clients: R rooms x B bidders x S
+spectators bidding through L lots. Reports bid-accept latency, broadcast
+fan-out latency, lot-advance correctness and Mongo operations per bid, and
+compares them against a stored baseline.
+
+    python benchmarks/auction_bench.py                      # run and compare
+    python benchmarks/auction_bench.py --save-baseline      # refresh baseline
+    python benchmarks/auction_bench.py --rooms 20 --bidders 10 --spectators 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+# A latency or Mongo-ops figure this much worse than baseline fails the run
+REGRESSION_TOLERANCE = 0.25
+
+
+def load_server(mongo_url):
+    """Import backend/server.py wired to the requested Mongo."""
+    os.environ["MONGO_URL"] = mongo_url or "mongodb://localhost:27017"
+    os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "auction_bench")
+    if not mongo_url:
+        import mongomock_motor
+        import motor.motor_asyncio
+        motor.motor_asyncio.AsyncIOMotorClient = mongomock_motor.AsyncMongoMockClient
+    sys.path.insert(0, str(ROOT / "backend"))
+    import server
+    return server
+
+
+class CountingCollection:
+    """Counts every awaited operation issued on a collection."""
+
+    def __init__(self, collection, counts):
+        self._collection = collection
+        self._counts = counts
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+        counts, collection = self._counts, self._collection.name
+
+        def counted(*args, **kwargs):
+            counts[(collection, name)] += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+class CountingDatabase:
+    def __init__(self, database):
+        self._database = database
+        self.counts = Counter()
+
+    def __getattr__(self, name):
+        attr = getattr(self._database, name)
+        if name.startswith("_") or callable(attr) and not hasattr(attr, "find_one"):
+            return attr
+        return CountingCollection(attr, self.counts)
+
+    def __getitem__(self, name):
+        return CountingCollection(self._database[name], self.counts)
+
+
+class ASGIWebSocket:
+    """Minimal in-process WebSocket client speaking ASGI to the app."""
+
+    def __init__(self, app, path):
+        self.app = app
+        self.path, _, query = path.partition("?")
+        self.query = query.encode()
+        self.to_app = asyncio.Queue()
+        self.from_app = asyncio.Queue()
+        self.task = None
+
+    async def connect(self):
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws",
+            "path": self.path, "raw_path": self.path.encode(), "root_path": "",
+            "query_string": self.query, "headers": [], "subprotocols": [],
+            "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        }
+        self.task = asyncio.create_task(self.app(scope, self.to_app.get, self.from_app.put))
+        await self.to_app.put({"type": "websocket.connect"})
+        message = await self.from_app.get()
+        if message["type"] != "websocket.accept":
+            raise RuntimeError(f"connection refused: {message}")
+
+    async def send_json(self, data):
+        await self.to_app.put({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def receive_json(self):
+        while True:
+            message = await self.from_app.get()
+            if message["type"] == "websocket.send":
+                return json.loads(message["text"])
+            if message["type"] == "websocket.close":
+                raise ConnectionError("closed by server")
+
+    async def close(self):
+        await self.to_app.put({"type": "websocket.disconnect", "code": 1000})
+        try:
+            await asyncio.wait_for(self.task, 1)
+        except (asyncio.TimeoutError, Exception):
+            self.task.cancel()
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def summarize(values):
+    return {
+        "p50": round(percentile(values, 0.50), 3) if values else None,
+        "p99": round(percentile(values, 0.99), 3) if values else None,
+        "max": round(max(values), 3) if values else None,
+        "count": len(values),
+    }
+
+
+class Room:
+    def __init__(self, code, room_id, lots, bidders):
+        self.code = code
+        self.id = room_id
+        self.lots = lots
+        self.bidders = bidders
+        self.bid_sent_at = {}  # amount -> perf_counter at send
+        self.events = []  # events seen by the first spectator
+        self.closed = asyncio.Event()
+
+
+async def setup_rooms(server, args):
+    host = await server.register_user(server.UserCreate(
+        username="bench-host", email="host@bench", password="x", user_type="host"))
+    rooms = []
+    for r in range(args.rooms):
+        room = await server.create_auction_room(server.AuctionRoomCreate(
+            room_name=f"bench-{r}", bid_coalesce_ms=args.coalesce_ms), host_id=host.id)
+        lots = []
+        for lot in range(args.lots):
+            player = await server.create_player(server.PlayerCreate(
+                name=f"r{r}-lot{lot}", player_type=random.choice(list(server.SQUAD_ROLE_TARGETS)),
+                stats=server.PlayerStats(strike_rate=random.uniform(80, 180), economy_rate=random.uniform(5, 10))
+            ), host_id=host.id)
+            await server.add_player_to_room(room.room_code, player.id, host.id)
+            lots.append(player.id)
+        bidders = []
+        for b in range(args.bidders):
+            user = await server.register_user(server.UserCreate(
+                username=f"r{r}-b{b}", email=f"r{r}-b{b}@bench", password="x", user_type="buyer"))
+            await server.create_buyer_profile(server.BuyerProfileCreate(budget=1e12), user_id=user.id)
+            await server.join_auction_room(room.room_code, user.id)
+            bidders.append(user.id)
+        # Short lots keep the run quick; the scheduler accepts fractional seconds
+        await server.db.auction_rooms.update_one({"id": room.id}, {"$set": {"bid_timer": args.bid_timer}})
+        server.room_cache.invalidate("id", room.id)
+        rooms.append(Room(room.room_code, room.id, lots, bidders))
+    return host, rooms
+
+
+async def spectate(room, ws, fanout, record):
+    while True:
+        try:
+            event = await ws.receive_json()
+        except ConnectionError:
+            return
+        if event["type"] == "new_bid":
+            sent = room.bid_sent_at.get(event["amount"])
+            if sent is not None:
+                fanout.append((time.perf_counter() - sent) * 1000)
+        if record:
+            room.events.append(event)
+        if event["type"] == "auction_completed":
+            room.closed.set()
+            return
+
+
+async def bid(room, user_id, ws, args, accept_latency, counters):
+    """Bid on every lot until the room completes; each bid awaits its ack."""
+    acks = {}
+    lot_over = asyncio.Event()
+    finished = asyncio.Event()
+    lot = 0
+
+    async def reader():
+        nonlocal lot
+        while True:
+            try:
+                event = await ws.receive_json()
+            except ConnectionError:
+                return
+            if event["type"] in ("bid_ack", "bid_reject"):
+                acks.pop(event["client_bid_id"]).set_result(event)
+            elif event["type"] == "next_player":
+                lot = event["player_index"]
+                lot_over.set()
+            elif event["type"] == "auction_completed":
+                lot_over.set()
+                finished.set()
+                return
+
+    reader_task = asyncio.create_task(reader())
+    highest, n = 0.0, 0
+    while not finished.is_set():
+        for _ in range(args.bids_per_lot):
+            amount = highest + random.randint(1, 1000) + random.random()
+            n += 1
+            client_bid_id = f"{user_id}-{n}"
+            acks[client_bid_id] = asyncio.get_running_loop().create_future()
+            room.bid_sent_at[amount] = sent = time.perf_counter()
+            await ws.send_json({"type": "bid", "client_bid_id": client_bid_id, "amount": amount,
+                                "player_id": room.lots[lot]})
+            reply = await acks[client_bid_id]
+            accept_latency.append((time.perf_counter() - sent) * 1000)
+            counters["sent"] += 1
+            counters["accepted" if reply["type"] == "bid_ack" else "rejected"] += 1
+            highest = max(highest, reply.get("highest_bid") or 0.0)
+            await asyncio.sleep(random.uniform(0, args.think_ms / 1000))
+        await lot_over.wait()
+        lot_over.clear()
+        highest = 0.0
+    reader_task.cancel()
+
+
+def check_lots(room):
+    """Every lot closes exactly once, in order, ending with auction_completed."""
+    errors = []
+    indexes = [e["player_index"] for e in room.events if e["type"] == "next_player"]
+    if indexes != list(range(1, len(room.lots))):
+        errors.append(f"room {room.code}: lot sequence {indexes}")
+    completions = sum(1 for e in room.events if e["type"] == "auction_completed")
+    if completions != 1:
+        errors.append(f"room {room.code}: {completions} completion events")
+    seqs = [e["seq"] for e in room.events if "seq" in e]
+    if seqs != sorted(seqs) or len(seqs) != len(set(seqs)):
+        errors.append(f"room {room.code}: out-of-order sequence numbers")
+    return errors
+
+
+async def check_awards(server, rooms):
+    errors = []
+    for room in rooms:
+        profiles = await server.db.buyer_profiles.find({"user_id": {"$in": room.bidders}}).to_list(length=None)
+        won = [player for profile in profiles for player in profile.get("current_team", [])]
+        if sorted(won) != sorted(room.lots):
+            errors.append(f"room {room.code}: {len(won)} lots awarded for {len(room.lots)} lots")
+    return errors
+
+
+async def run(args):
+    random.seed(args.seed)
+    server = load_server(args.mongo_url)
+    await server.app.router.startup()
+    host, rooms = await setup_rooms(server, args)
+
+    counting = CountingDatabase(server.db)
+    server.db = counting
+
+    accept_latency, fanout = [], []
+    counters = Counter()
+    sockets, tasks = [], []
+    for room in rooms:
+        for s in range(args.spectators):
+            ws = ASGIWebSocket(server.app, f"/ws/{room.code}/spectator-{s}")
+            await ws.connect()
+            sockets.append(ws)
+            tasks.append(asyncio.create_task(spectate(room, ws, fanout, record=(s == 0))))
+        bidder_sockets = []
+        for user_id in room.bidders:
+            ws = ASGIWebSocket(server.app, f"/ws/{room.code}/{user_id}")
+            await ws.connect()
+            sockets.append(ws)
+            bidder_sockets.append((user_id, ws))
+        room.bidder_sockets = bidder_sockets
+
+    started = time.perf_counter()
+    for room in rooms:
+        await server.start_auction(room.code, host.id)
+        for user_id, ws in room.bidder_sockets:
+            tasks.append(asyncio.create_task(bid(room, user_id, ws, args, accept_latency, counters)))
+    await asyncio.wait_for(asyncio.gather(*(room.closed.wait() for room in rooms)), args.timeout)
+    elapsed = time.perf_counter() - started
+    await server.bid_log.flush()
+    # Stop counting before the harness's own verification reads
+    server.db = counting._database
+    ops = sum(counting.counts.values())
+
+    errors = [error for room in rooms for error in check_lots(room)]
+    errors += await check_awards(server, rooms)
+
+    for task in tasks:
+        task.cancel()
+    for ws in sockets:
+        await ws.close()
+    await server.app.router.shutdown()
+
+    return {
+        "config": {key: value for key, value in vars(args).items()
+                   if key not in ("save_baseline", "no_compare", "baseline", "mongo_url")},
+        "mongo": args.mongo_url and "mongod" or "mongomock",
+        "bids_sent": counters["sent"],
+        "bids_accepted": counters["accepted"],
+        "bids_per_second": round(counters["sent"] / elapsed, 1),
+        "bid_accept_ms": summarize(accept_latency),
+        "fanout_ms": summarize(fanout),
+        "mongo_ops": dict(sorted((f"{c}.{op}", n) for (c, op), n in counting.counts.items())),
+        "mongo_ops_per_bid": round(ops / max(counters["sent"], 1), 3),
+        "lot_errors": errors,
+    }
+
+
+def compare(result, baseline):
+    """Human-readable regressions of ``result`` against ``baseline``."""
+    regressions = []
+    if result["lot_errors"]:
+        regressions.extend(result["lot_errors"])
+    checks = [
+        ("bid_accept_ms.p99", result["bid_accept_ms"]["p99"], baseline["bid_accept_ms"]["p99"]),
+        ("fanout_ms.p99", result["fanout_ms"]["p99"], baseline["fanout_ms"]["p99"]),
+        ("mongo_ops_per_bid", result["mongo_ops_per_bid"], baseline["mongo_ops_per_bid"]),
+    ]
+    for name, current, before in checks:
+        if current is not None and before and current > before * (1 + REGRESSION_TOLERANCE):
+            regressions.append(f"{name}: {current} vs baseline {before}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, default=4)
+    parser.add_argument("--bidders", type=int, default=8)
+    parser.add_argument("--spectators", type=int, default=50)
+    parser.add_argument("--lots", type=int, default=5)
+    parser.add_argument("--bids-per-lot", type=int, default=10, help="bids each bidder places per lot")
+    parser.add_argument("--think-ms", type=float, default=5, help="max random pause between a bidder's bids")
+    parser.add_argument("--bid-timer", type=float, default=0.3, help="lot timer in seconds")
+    parser.add_argument("--coalesce-ms", type=int, default=None, help="per-room bid broadcast coalescing")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--mongo-url", default=None, help="real mongod to use instead of mongomock")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--no-compare", action="store_true")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return
+    if args.no_compare or not args.baseline.exists():
+        sys.exit(1 if result["lot_errors"] else 0)
+
+    regressions = compare(result, json.loads(args.baseline.read_text()))
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,8 @@ const App = () => {
   const [bidTimer, setBidTimer] = useState(5);
   const [isTimerActive, setIsTimerActive] = useState(false);
   const timerRef = useRef(null);
+  // Last event sequence number seen, and the room it belongs to
+  const lastSeqRef = useRef({ roomCode: null, seq: null });
 
   // Login Component
   const LoginRegister = () => {
@@ -404,8 +406,17 @@ const App = () => {
 
     const loadPlayers = async () => {
       try {
-        const response = await axios.get(`${API}/players`);
-        setPlayers(response.data);
+        // The catalog is served in keyset pages; follow the cursor header
+        const allPlayers = [];
+        let cursor = null;
+        do {
+          const response = await axios.get(`${API}/players`, {
+            params: { limit: 500, ...(cursor && { cursor }) }
+          });
+          allPlayers.push(...response.data);
+          cursor = response.headers['x-next-cursor'];
+        } while (cursor);
+        setPlayers(allPlayers);
       } catch (error) {
         console.error('Failed to load players:', error);
       }
@@ -580,8 +591,14 @@ const App = () => {
         setAuctionRoom(roomResponse.data);
         setCurrentView('auction');
         
-        // Connect to WebSocket
-        const wsUrl = `wss://sportsbid.preview.emergentagent.com/ws/${roomCode}/${user.id}`;
+        // Connect to WebSocket; when rejoining the same room, ask only for the events we missed
+        const joinedCode = roomResponse.data.room_code;
+        if (lastSeqRef.current.roomCode !== joinedCode) {
+          lastSeqRef.current = { roomCode: joinedCode, seq: null };
+        }
+        const lastSeq = lastSeqRef.current.seq;
+        const since = lastSeq !== null ? `?since=${lastSeq}` : '';
+        const wsUrl = `wss://sportsbid.preview.emergentagent.com/ws/${roomCode}/${user.id}${since}`;
         const ws = new WebSocket(wsUrl);
         setSocket(ws);
       } catch (error) {
@@ -774,11 +791,10 @@ const App = () => {
 
         // Load players for this auction
         if (auctionRoom.players.length > 0) {
-          const playerPromises = auctionRoom.players.map(playerId =>
-            axios.get(`${API}/players/${playerId}`)
-          );
-          const playerResponses = await Promise.all(playerPromises);
-          setPlayers(playerResponses.map(res => res.data));
+          const playersResponse = await axios.post(`${API}/players/batch`, {
+            ids: auctionRoom.players
+          });
+          setPlayers(playersResponse.data);
         }
       } catch (error) {
         console.error('Failed to load auction data:', error);
@@ -789,12 +805,30 @@ const App = () => {
       if (socket) {
         socket.onmessage = (event) => {
           const data = JSON.parse(event.data);
+          if (data.seq !== undefined) {
+            lastSeqRef.current.seq = data.seq;
+          }
           
-          if (data.type === 'auction_started') {
+          if (data.type === 'snapshot') {
+            setAuctionRoom(prev => ({
+              ...prev,
+              auction_status: data.auction_status,
+              players: data.players,
+              current_player_index: data.current_player_index,
+              current_highest_bid: data.current_highest_bid,
+              current_highest_bidder: data.current_highest_bidder
+            }));
+            if (data.auction_status === 'active' && data.time_left !== null) {
+              setIsTimerActive(true);
+              startBidTimer(Math.ceil(data.time_left));
+            }
+          } else if (data.type === 'auction_started') {
             setIsTimerActive(true);
-            startBidTimer();
+            startBidTimer(data.bid_timer);
           } else if (data.type === 'new_bid') {
             setBids(prev => [...prev, data]);
+            // The server pushes the lot deadline back on every accepted bid
+            startBidTimer();
             // Update room state
             setAuctionRoom(prev => ({
               ...prev,
@@ -808,10 +842,12 @@ const App = () => {
               current_highest_bid: 0,
               current_highest_bidder: null
             }));
-            setBidTimer(5);
             setIsTimerActive(true);
-            startBidTimer();
+            startBidTimer(data.bid_timer);
+          } else if (data.type === 'bid_reject') {
+            alert('Failed to place bid: ' + data.reason);
           } else if (data.type === 'auction_completed') {
+            clearInterval(timerRef.current);
             setIsTimerActive(false);
             alert('Auction completed!');
           }
@@ -819,17 +855,14 @@ const App = () => {
       }
     };
 
-    const startBidTimer = () => {
-      setBidTimer(5);
+    // Display-only countdown; the server closes each lot on its own deadline
+    const startBidTimer = (seconds = auctionRoom.bid_timer || 5) => {
+      clearInterval(timerRef.current);
+      setBidTimer(seconds);
       timerRef.current = setInterval(() => {
         setBidTimer(prev => {
           if (prev <= 1) {
             clearInterval(timerRef.current);
-            setIsTimerActive(false);
-            // Send timer end message
-            if (socket) {
-              socket.send(JSON.stringify({ type: 'bid_timer_end' }));
-            }
             return 0;
           }
           return prev - 1;
@@ -846,10 +879,24 @@ const App = () => {
         return;
       }
 
+      const playerId = auctionRoom.players[auctionRoom.current_player_index];
+
+      // Bid over the open room socket; the server answers with bid_ack / bid_reject
+      if (socket && socket.readyState === WebSocket.OPEN) {
+        socket.send(JSON.stringify({
+          type: 'bid',
+          client_bid_id: `${user.id}-${Date.now()}`,
+          player_id: playerId,
+          amount: bidAmountInRupees
+        }));
+        setBidAmount('');
+        return;
+      }
+
       try {
         await axios.post(`${API}/bids?bidder_id=${user.id}`, {
           room_id: auctionRoom.id,
-          player_id: players[auctionRoom.current_player_index]?.id,
+          player_id: playerId,
           amount: bidAmountInRupees
         });
         setBidAmount('');
@@ -858,7 +905,9 @@ const App = () => {
       }
     };
 
-    const currentPlayer = players[auctionRoom?.current_player_index] || null;
+    // Look the lot up by id: the batch endpoint skips players that no longer exist
+    const currentPlayerId = auctionRoom?.players?.[auctionRoom.current_player_index];
+    const currentPlayer = players.find(player => player.id === currentPlayerId) || null;
 
     return (
       <div className="min-h-screen bg-gradient-to-br from-red-900 via-orange-900 to-yellow-900 p-4">
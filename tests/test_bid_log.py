@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+server = pytest.importorskip("server")
+
+
+class SlowCollection:
+    """Records writes and yields to the event loop for ``delay`` seconds on each."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.bids = []
+
+    async def bulk_write(self, updates, ordered=True):
+        await asyncio.sleep(self.delay)
+        for update in updates:
+            self.bids.extend(update._doc["$push"]["bids"]["$each"])
+
+    async def update_one(self, query, update):
+        await asyncio.sleep(self.delay)
+
+
+class SlowDatabase:
+    def __init__(self, delay):
+        self.bid_buckets = SlowCollection(delay)
+        self.auction_rooms = SlowCollection(delay)
+
+
+def test_flush_is_not_held_up_by_bids_queued_after_it(monkeypatch):
+    database = SlowDatabase(0.005)
+    monkeypatch.setattr(server, "db", database)
+
+    async def scenario():
+        log = server.BidLogWriter()
+        stop = asyncio.Event()
+
+        async def bidder(room):
+            amount = 0
+            while not stop.is_set():
+                amount += 1
+                await log.append(server.Bid(room_id=room, player_id="p", bidder_id="b", amount=amount), 0)
+                await asyncio.sleep(0.002)
+
+        bidders = [asyncio.create_task(bidder(f"room-{n}")) for n in range(20)]
+        await asyncio.sleep(0.05)
+        queued = {bid.id for _, bid, _ in list(log.queue._queue)} | {bid.id for _, bid, _ in log._retry}
+        await asyncio.wait_for(log.flush(), 1.0)
+        written = {entry["id"] for entry in database.bid_buckets.bids}
+        stop.set()
+        await asyncio.gather(*bidders)
+        await log.stop()
+        return queued, written
+
+    queued, written = asyncio.run(scenario())
+    assert queued <= written
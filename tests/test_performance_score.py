@@ -0,0 +1,36 @@
+import random
+
+import pytest
+
+server = pytest.importorskip("server")
+
+PLAYER_TYPES = ["batsman", "bowler", "all-rounder", "wicket-keeper"]
+
+
+def random_stats(rng: random.Random) -> "server.PlayerStats":
+    return server.PlayerStats(
+        batting_average=rng.choice([0.0, rng.uniform(0, 80)]),
+        strike_rate=rng.choice([0.0, rng.uniform(0, 250)]),
+        centuries=rng.randint(0, 12),
+        fifties=rng.randint(0, 30),
+        wickets_taken=rng.choice([0, rng.randint(0, 400)]),
+        economy_rate=rng.choice([0.0, rng.uniform(0, 14)]),
+        catches=rng.randint(0, 40),
+        run_outs=rng.randint(0, 15),
+        recent_form_rating=rng.uniform(0, 10),
+        experience_years=rng.randint(0, 25),
+    )
+
+
+def test_vectorized_scores_match_scalar():
+    rng = random.Random(7)
+    stats = [random_stats(rng) for _ in range(2000)]
+    types = [rng.choice(PLAYER_TYPES) for _ in stats]
+
+    scores = server.calculate_performance_scores(stats, types)
+
+    assert scores.tolist() == [server.calculate_performance_score(s, t) for s, t in zip(stats, types)]
+
+
+def test_vectorized_scores_of_empty_batch():
+    assert len(server.calculate_performance_scores([], [])) == 0
@@ -0,0 +1,71 @@
+import itertools
+import random
+
+import pytest
+
+server = pytest.importorskip("server")
+
+ROLES = list(server.SQUAD_ROLE_TARGETS)
+
+
+def brute_force_value(profile, index, slots):
+    """Best total score over every affordable squad that respects the role quotas."""
+    filled = {}
+    for player_id in profile.current_team:
+        role = index.players[player_id][0]
+        filled[role] = filled.get(role, 0) + 1
+    quotas = {
+        role: max(min(target - filled.get(role, 0), slots), 0)
+        for role, target in server.SQUAD_ROLE_TARGETS.items()
+        if not profile.preferred_players or role in profile.preferred_players
+    }
+    pool = [
+        (player_id, role, score) for player_id, (role, score) in index.players.items()
+        if player_id not in index.sold and quotas.get(role, 0) > 0
+        and server.expected_price(score, profile.budget) <= profile.remaining_budget
+    ]
+    best = 0.0
+    for size in range(1, slots + 1):
+        for squad in itertools.combinations(pool, size):
+            if any(sum(1 for _, r, _ in squad if r == role) > quota for role, quota in quotas.items()):
+                continue
+            cost = sum(server.expected_price(score, profile.budget) for _, _, score in squad)
+            if cost <= profile.remaining_budget:
+                best = max(best, sum(score for _, _, score in squad))
+    return best
+
+
+def random_case(rng):
+    index = server.PlayerRankIndex()
+    # At most three players per role, so the optimizer's candidate lists hold every affordable one
+    for role in ROLES:
+        for n in range(rng.randint(0, 3)):
+            index.add(f"{role}-{n}", role, round(rng.uniform(0, 10), 2))
+    team = [player_id for player_id in list(index.players) if rng.random() < 0.15]
+    for player_id in team:
+        index.mark_sold(player_id)
+    budget = rng.choice([500.0, 1000.0, 5000.0])
+    profile = server.BuyerProfile(
+        user_id="buyer",
+        budget=budget,
+        remaining_budget=budget * rng.uniform(0.05, 1.0),
+        preferred_players=rng.sample(ROLES, rng.randint(0, 2)),
+        current_team=team,
+    )
+    return profile, index
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_optimizer_matches_brute_force(seed):
+    rng = random.Random(seed)
+    profile, index = random_case(rng)
+    slots = rng.randint(1, server.SQUAD_OPTIMIZER_SLOTS)
+
+    picks = server.optimize_squad(profile, index, slots=slots)
+
+    assert len(picks) == len(set(picks)) <= slots
+    assert not set(picks) & index.sold
+    cost = sum(server.expected_price(index.players[p][1], profile.budget) for p in picks)
+    assert cost <= profile.remaining_budget + 1e-9
+    value = sum(index.players[p][1] for p in picks)
+    assert value == pytest.approx(brute_force_value(profile, index, slots))